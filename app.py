@@ -4,18 +4,53 @@ Robust Streamlit Implementation with Fallback Data
 """
 
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime, timedelta
-import json
-import re
-import time
-import plotly.graph_objects as go
-import plotly.express as px
-from typing import Dict, List, Optional
-import base64
-from io import BytesIO
+from functools import partial
+from typing import Callable, Dict, Tuple
+import hashlib
+import tempfile
+
+from export import EXPORT_FORMATS, export_snapshots
+from health import HealthRegistry
+from matching import model_price_comparison
+from offers import PAGE_SIZE, OfferIndex, build_offer_index, offers_frame
+from refresh import RefreshCoordinator
+from rules import RULES_PATH
+from telemetry import TELEMETRY, span
+from views import (
+    create_discount_heatmap,
+    create_keyword_chart,
+    create_keyword_table,
+    create_model_comparison_table,
+    create_overview_table,
+    create_price_comparison_chart,
+    create_price_table,
+    create_trend_chart,
+    export_json_data,
+    format_age,
+    generate_competitive_alerts,
+)
+from intelligence import (
+    COMPETITORS,
+    DEMO_DATA,
+    CompetitorIntelligence,
+    HEALTH_PATH,
+    SnapshotStore,
+    mark_stale,
+    run_refresh,
+)
+
+# Memoized figures and tables kept across reruns and sessions (LRU-evicted)
+VIEW_CACHE_MAX_ENTRIES = 128
+
+# Paged offer views: expanders per page in the detail view, filter choices
+DETAIL_PAGE_SIZE = 20
+PRICE_KINDS = {"Alle": None, "Kaufpreis": False, "Monatsrate": True}
+SORT_OPTIONS = {"Preis": 'amount', "Rabatt": 'discount_pct', "Wettbewerber": 'competitor',
+                "Angebot": 'title', "Kategorie": 'category'}
+
+# Trend ranges in days; None covers the whole history
+TREND_RANGES = {"4 Wochen": 28, "3 Monate": 91, "1 Jahr": 365, "Alles": None}
 
 # Page Configuration
 st.set_page_config(
@@ -46,326 +81,370 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'data_cache' not in st.session_state:
-    st.session_state.data_cache = {}
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = None
-if 'demo_mode' not in st.session_state:
-    st.session_state.demo_mode = True
+def data_fingerprint(data: Dict) -> str:
+    """Content key for displayed data.
+    
+    Stored snapshots are immutable, so their ids identify the content;
+    demo entries are constant per process.
+    """
+    digest = hashlib.sha1()
+    for name, comp_data in data.items():
+        digest.update(f"{name}\x1f{comp_data.get('snapshot_id')}\x1f{comp_data.get('source')}\x1e".encode())
+    return digest.hexdigest()
 
-# Configuration
-COMPETITORS = {
-    'Emil Frey': {
-        'url': 'https://www.emilfrey.ch',
-        'aktionen_url': 'https://www.emilfrey.ch/de/aktionen',
-        'selector_title': 'h1, h2, h3, .title, .headline',
-        'selector_price': '.price, .preis, span[class*="price"], .cost'
-    },
-    'Garage Weiss': {
-        'url': 'https://www.garage-weiss.ch',
-        'aktionen_url': 'https://www.garage-weiss.ch/angebote',
-        'selector_title': 'h1, h2, h3, .title',
-        'selector_price': '.price, .preis, span[class*="price"]'
-    },
-    'Auto Kunz': {
-        'url': 'https://www.autokunz.ch',
-        'aktionen_url': 'https://www.autokunz.ch/aktionen',
-        'selector_title': 'h1, h2, h3',
-        'selector_price': '.price, .preis'
-    },
-    'AMAG': {
-        'url': 'https://www.amag.ch',
-        'aktionen_url': 'https://www.amag.ch/de/angebote',
-        'selector_title': 'h1, h2, h3',
-        'selector_price': '.price'
-    }
-}
+@st.cache_data(max_entries=VIEW_CACHE_MAX_ENTRIES, show_spinner=False)
+def _memoized_view(builder: str, fingerprint: str, _build: Callable, _args: Tuple):
+    # Only cache misses reach this point, so the span measures real build cost
+    with span('render', view=builder):
+        return _build(*_args)
 
-# Robust Demo Data
-DEMO_DATA = {
-    'Emil Frey': {
-        'aktionen': [
-            {'title': 'VW Golf 8 - Winteraktion 2025', 'price': 'CHF 29,900', 'discount': '15% Rabatt', 'type': 'Neuwagen'},
-            {'title': 'Audi A3 Sportback - Top-Leasing', 'price': 'CHF 299/Mt', 'discount': '0% Leasing', 'type': 'Leasing'},
-            {'title': 'Service-Paket Winter Komplett', 'price': 'CHF 199', 'discount': '20% Rabatt', 'type': 'Service'},
-            {'title': 'Seat Leon FR - Lagerfahrzeug', 'price': 'CHF 26,500', 'discount': '18% Rabatt', 'type': 'Lagerfahrzeug'}
-        ],
-        'keywords': ['winteraktion', 'leasing', 'service', 'vw', 'audi', 'rabatt', 'seat', 'lagerfahrzeug'],
-        'metrics': {'total_offers': 12, 'avg_discount': 15.5, 'new_this_week': 3},
-        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
-    },
-    'Garage Weiss': {
-        'aktionen': [
-            {'title': 'Mercedes A-Klasse Edition', 'price': 'CHF 35,500', 'discount': '10% Rabatt', 'type': 'Neuwagen'},
-            {'title': 'BMW 3er - Business Paket', 'price': 'CHF 45,900', 'discount': 'Inkl. Extras', 'type': 'Business'},
-            {'title': 'Winterreifen-Aktion 2025', 'price': 'CHF 599', 'discount': '25% Rabatt', 'type': 'Reifen'},
-            {'title': 'Smart EQ - Elektro-Bonus', 'price': 'CHF 19,900', 'discount': 'Ökoprämie', 'type': 'Elektro'}
-        ],
-        'keywords': ['mercedes', 'bmw', 'business', 'winterreifen', 'premium', 'elektro', 'smart'],
-        'metrics': {'total_offers': 8, 'avg_discount': 12.3, 'new_this_week': 2},
-        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
-    },
-    'Auto Kunz': {
-        'aktionen': [
-            {'title': 'Toyota Hybrid-Wochen', 'price': 'CHF 31,900', 'discount': 'Ökobonus CHF 2000', 'type': 'Hybrid'},
-            {'title': 'Mazda CX-5 4x4 Revolution', 'price': 'CHF 39,900', 'discount': '12% Rabatt', 'type': 'SUV'},
-            {'title': 'Gratis-Service 3 Jahre', 'price': 'CHF 0', 'discount': 'Beim Neukauf', 'type': 'Service'},
-            {'title': 'Ford Kuga - Lagerräumung', 'price': 'CHF 28,900', 'discount': '22% Rabatt', 'type': 'Lagerfahrzeug'}
-        ],
-        'keywords': ['hybrid', 'toyota', 'mazda', '4x4', 'ökobonus', 'gratis', 'ford', 'suv'],
-        'metrics': {'total_offers': 10, 'avg_discount': 14.8, 'new_this_week': 4},
-        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
-    },
-    'AMAG': {
-        'aktionen': [
-            {'title': 'VW ID.4 - Elektro-Offensive', 'price': 'CHF 42,900', 'discount': 'Inkl. Wallbox', 'type': 'Elektro'},
-            {'title': 'Audi Q5 - Premium-Leasing', 'price': 'CHF 599/Mt', 'discount': '1.9% Zins', 'type': 'Leasing'},
-            {'title': 'SEAT Ibiza - Young Driver', 'price': 'CHF 18,900', 'discount': '20% Rabatt', 'type': 'Young Driver'},
-            {'title': 'Skoda Octavia Combi', 'price': 'CHF 29,900', 'discount': 'CHF 3000 Prämie', 'type': 'Kombi'}
-        ],
-        'keywords': ['elektro', 'id4', 'premium', 'leasing', 'young', 'skoda', 'vw', 'audi'],
-        'metrics': {'total_offers': 15, 'avg_discount': 16.2, 'new_this_week': 5},
-        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
-    }
-}
+def memoized(builder: Callable, fingerprint: str, *args):
+    """Reuse a figure or table already built for the same data"""
+    return _memoized_view(builder.__name__, fingerprint, builder, args)
+
+@st.cache_resource
+def get_health() -> HealthRegistry:
+    """Process-wide circuit breaker state, shared with the scheduler through its file"""
+    return HealthRegistry(HEALTH_PATH)
+
+@st.cache_resource
+def get_scraper() -> CompetitorIntelligence:
+    """Process-wide scraper so the connection pool survives reruns"""
+    return CompetitorIntelligence(health=get_health())
 
-class CompetitorIntelligence:
-    """Main scraping and analysis class"""
+@st.cache_resource
+def get_store() -> SnapshotStore:
+    """Process-wide snapshot store shared by all dashboard sessions"""
+    return SnapshotStore()
+
+@st.cache_resource
+def get_refresher() -> RefreshCoordinator:
+    """Process-wide single-flight refresh, so concurrent clicks share one scrape"""
+    return RefreshCoordinator(partial(run_refresh, get_scraper(), get_store()))
+
+def load_dashboard_data(store: SnapshotStore, health: HealthRegistry) -> Dict[str, Dict]:
+    """Latest snapshot per competitor, demo data where nothing was scraped yet.
     
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    Snapshots of competitors whose last scrape failed are marked stale.
+    """
+    latest = store.latest()
+    health.reload()
+    data = {}
+    for name in COMPETITORS:
+        snapshot = latest.get(name)
+        error = health.last_error(name)
+        if snapshot is None:
+            data[name] = {**DEMO_DATA.get(name, {}), 'source': 'demo', 'error': error}
+        else:
+            data[name] = mark_stale(snapshot, error) if error else snapshot
+    return data
+
+def render_offer_filters(index: OfferIndex, key: str) -> Dict:
+    """Filter and sort controls for a paged offer view; returns OfferIndex.match arguments"""
+    with st.expander("🔎 Filter & Sortierung"):
+        col1, col2, col3 = st.columns(3)
+        categories = col1.multiselect("Kategorie", index.categories, key=f"{key}_categories")
+        price_kind = col2.selectbox("Preisart", list(PRICE_KINDS), key=f"{key}_price_kind")
+        min_discount = col3.slider("Rabatt ab (%)", 0, 50, 0, step=5, key=f"{key}_discount")
         
-    def scrape_competitor(self, name: str, config: Dict) -> Dict:
-        """Attempt to scrape, fallback to demo data"""
-        try:
-            # Attempt real scraping with timeout
-            response = requests.get(
-                config['aktionen_url'], 
-                headers=self.headers, 
-                timeout=3,
-                verify=False  # In case of SSL issues
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract titles and prices
-                titles = []
-                prices = []
-                
-                for selector in config['selector_title'].split(', '):
-                    titles.extend([t.text.strip() for t in soup.select(selector)[:3]])
-                
-                for selector in config['selector_price'].split(', '):
-                    prices.extend([p.text.strip() for p in soup.select(selector)[:3]])
-                
-                if titles:  # Found real data
-                    aktionen = []
-                    for i, title in enumerate(titles[:4]):
-                        aktionen.append({
-                            'title': title,
-                            'price': prices[i] if i < len(prices) else 'Auf Anfrage',
-                            'discount': self._extract_discount(title),
-                            'type': 'Live-Daten'
-                        })
-                    
-                    return {
-                        'aktionen': aktionen,
-                        'keywords': self._extract_keywords(soup.get_text()),
-                        'metrics': {'total_offers': len(aktionen), 'avg_discount': 10, 'new_this_week': 1},
-                        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M'),
-                        'source': 'live'
-                    }
-        except Exception as e:
-            st.session_state.demo_mode = True
-            
-        # Return demo data as fallback
-        return {**DEMO_DATA.get(name, {}), 'source': 'demo'}
-    
-    def _extract_discount(self, text: str) -> str:
-        """Extract discount information"""
-        text = text.lower()
-        if match := re.search(r'(\d+)\s*%', text):
-            return f"{match.group(1)}% Rabatt"
-        return "Sonderangebot"
-    
-    def _extract_keywords(self, text: str) -> List[str]:
-        """Extract relevant keywords"""
-        keywords = []
-        keyword_list = ['leasing', 'rabatt', 'gratis', 'aktion', 'hybrid', 'elektro', 'service']
-        for kw in keyword_list:
-            if kw in text.lower():
-                keywords.append(kw)
-        return keywords[:10]
+        col1, col2, col3 = st.columns(3)
+        low, high = index.price_bounds
+        price_range = (col1.slider("Preis (CHF)", low, high, (low, high), key=f"{key}_price")
+                       if high > low else (None, None))
+        sort = col2.selectbox("Sortieren nach", list(SORT_OPTIONS), key=f"{key}_sort")
+        descending = col3.checkbox("Absteigend", key=f"{key}_descending")
+    
+    filtered_range = price_range != (low, high)
+    return {'categories': categories, 'monthly': PRICE_KINDS[price_kind], 'min_discount': min_discount,
+            'min_price': price_range[0] if filtered_range else None,
+            'max_price': price_range[1] if filtered_range else None,
+            'sort': SORT_OPTIONS[sort], 'descending': descending}
 
-def create_price_comparison_chart(data: Dict) -> go.Figure:
-    """Create price comparison visualization"""
-    fig = go.Figure()
-    
-    for competitor, comp_data in data.items():
-        aktionen = comp_data.get('aktionen', [])
-        if aktionen:
-            # Extract numeric prices
-            prices = []
-            labels = []
-            for a in aktionen[:3]:  # Top 3 offers
-                price_str = a.get('price', '0')
-                if match := re.search(r'(\d+[\'\d]*)', price_str.replace(',', '')):
-                    prices.append(int(match.group(1).replace("'", "")))
-                    labels.append(a['title'][:20] + '...')
-            
-            if prices:
-                fig.add_trace(go.Bar(
-                    name=competitor,
-                    x=labels,
-                    y=prices,
-                    text=[f"{p:,} CHF" for p in prices],
-                    textposition='auto',
-                ))
-    
-    fig.update_layout(
-        title='Preisvergleich Top-Angebote',
-        xaxis_title='Angebote',
-        yaxis_title='Preis (CHF)',
-        barmode='group',
-        height=400,
-        template='plotly_white'
-    )
-    
-    return fig
+def render_pager(total: int, page_size: int, key: str) -> int:
+    """Page selector for ``total`` rows; returns the zero-based page"""
+    pages = max(1, -(-total // page_size))
+    if st.session_state.get(key, 1) > pages:  # Filters shrank the result
+        st.session_state[key] = 1
+    page = st.number_input(f"Seite (von {pages})", min_value=1, max_value=pages, key=key) if pages > 1 else 1
+    start = (page - 1) * page_size
+    st.caption(f"{min(start + 1, total)}–{min(start + page_size, total)} von {total} Angeboten")
+    return page - 1
 
-def create_discount_heatmap(data: Dict) -> go.Figure:
-    """Create discount heatmap"""
-    competitors = list(data.keys())
-    categories = ['Neuwagen', 'Leasing', 'Service', 'Elektro']
-    
-    # Create matrix
-    z = []
-    for comp in competitors:
-        row = []
-        for cat in categories:
-            # Count offers in category
-            count = sum(1 for a in data[comp].get('aktionen', []) 
-                       if cat.lower() in str(a.get('type', '')).lower())
-            row.append(count)
-        z.append(row)
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=z,
-        x=categories,
-        y=competitors,
-        colorscale='RdYlGn',
-        text=z,
-        texttemplate="%{text}",
-        textfont={"size": 14},
-    ))
-    
-    fig.update_layout(
-        title='Angebots-Heatmap nach Kategorie',
-        height=350,
-        template='plotly_white'
-    )
-    
-    return fig
+def render_overview(display_data: Dict, fingerprint: str):
+    # Key metrics
+    st.subheader("Key Performance Indicators")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    total_offers = sum(len(d.get('aktionen', [])) for d in display_data.values())
+    avg_discount = sum(d.get('metrics', {}).get('avg_discount', 0) for d in display_data.values()) / max(len(display_data), 1)
+    new_offers = sum(d.get('metrics', {}).get('new_this_week', 0) for d in display_data.values())
+    
+    col1.metric("Total Aktionen", total_offers, delta=f"+{new_offers} neu")
+    col2.metric("Ø Rabatt", f"{avg_discount:.1f}%", delta="2.3%")
+    col3.metric("Aktive Wettbewerber", len(display_data))
+    col4.metric("Keywords erkannt", sum(len(d.get('keywords', [])) for d in display_data.values()))
+    
+    st.divider()
+    
+    # Competitor overview table
+    st.subheader("Wettbewerber-Übersicht")
+    
+    offers = memoized(offers_frame, fingerprint, display_data)
+    df = memoized(create_overview_table, fingerprint, display_data, offers)
+    st.dataframe(df, use_container_width=True, hide_index=True)
 
-def generate_competitive_alerts(data: Dict) -> List[Dict]:
-    """Generate intelligent alerts"""
-    alerts = []
-    
-    for competitor, comp_data in data.items():
-        if competitor == 'AMAG':
-            continue
-            
-        for aktion in comp_data.get('aktionen', []):
-            # High discount alerts
-            if any(x in str(aktion.get('discount', '')) for x in ['20%', '22%', '25%']):
-                alerts.append({
-                    'level': 'critical',
-                    'icon': '🔴',
-                    'message': f"{competitor}: Aggressive Rabattaktion - {aktion['title']} ({aktion['discount']})"
-                })
-            
-            # Leasing alerts
-            if 'leasing' in aktion.get('title', '').lower():
-                if 'CHF' in aktion.get('price', '') and '/Mt' in aktion.get('price', ''):
-                    alerts.append({
-                        'level': 'warning',
-                        'icon': '🟡',
-                        'message': f"{competitor}: Attraktives Leasing - {aktion['price']}"
-                    })
-            
-            # Free service alerts
-            if 'gratis' in aktion.get('title', '').lower():
-                alerts.append({
-                    'level': 'info',
-                    'icon': '🔵',
-                    'message': f"{competitor}: Gratis-Angebot - {aktion['title']}"
-                })
-    
-    # Content gap analysis
-    our_keywords = set(data.get('AMAG', {}).get('keywords', []))
-    competitor_keywords = set()
-    for comp, comp_data in data.items():
-        if comp != 'AMAG':
-            competitor_keywords.update(comp_data.get('keywords', []))
-    
-    missing = competitor_keywords - our_keywords
-    if missing:
-        alerts.append({
-            'level': 'warning',
-            'icon': '🟡',
-            'message': f"Content Gap: Fehlende Keywords - {', '.join(list(missing)[:3])}"
-        })
-    
-    return alerts[:6]
+def render_prices(display_data: Dict, fingerprint: str):
+    st.subheader("Preisvergleich & Rabattanalyse")
+    
+    offers = memoized(offers_frame, fingerprint, display_data)
+    comparison = memoized(model_price_comparison, fingerprint, offers)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Price comparison chart
+        if display_data:
+            fig = memoized(create_price_comparison_chart, fingerprint, offers, comparison)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        # Discount heatmap
+        if display_data:
+            fig = memoized(create_discount_heatmap, fingerprint, offers)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Same model at several competitors, cheapest price each
+    if not comparison.empty:
+        st.subheader("Modellvergleich")
+        st.dataframe(memoized(create_model_comparison_table, fingerprint, comparison),
+                     use_container_width=True, hide_index=True)
+    
+    # Price table: filtered and paged on the server, one page goes to the browser
+    st.subheader("Detaillierte Preisübersicht")
+    if not offers.empty:
+        index = memoized(build_offer_index, fingerprint, offers)
+        rows = index.match(**render_offer_filters(index, key="prices"))
+        page = render_pager(len(rows), PAGE_SIZE, key="prices_page")
+        st.dataframe(create_price_table(index.page(rows, page)), use_container_width=True, hide_index=True)
 
-def export_json_data(data: Dict) -> str:
-    """Export data as JSON"""
-    export_data = {
-        'timestamp': datetime.now().isoformat(),
-        'data': data,
-        'summary': {
-            'total_competitors': len(data),
-            'total_offers': sum(len(d.get('aktionen', [])) for d in data.values()),
-            'data_source': 'demo' if st.session_state.demo_mode else 'live'
-        }
-    }
-    return json.dumps(export_data, indent=2, ensure_ascii=False)
+def render_alerts(display_data: Dict, fingerprint: str):
+    st.subheader("🚨 Competitive Alerts & Intelligence")
+    
+    offers = memoized(offers_frame, fingerprint, display_data)
+    rules_key = f"{fingerprint}:{RULES_PATH.stat().st_mtime}"
+    alerts = memoized(generate_competitive_alerts, rules_key, display_data, offers)
+    
+    if alerts:
+        for alert in alerts:
+            if alert['level'] == 'critical':
+                st.error(f"{alert['icon']} {alert['message']}")
+            elif alert['level'] == 'warning':
+                st.warning(f"{alert['icon']} {alert['message']}")
+            else:
+                st.info(f"{alert['icon']} {alert['message']}")
+    else:
+        st.success("✅ Keine kritischen Wettbewerber-Aktivitäten erkannt")
+    
+    st.divider()
+    
+    # Recommendations
+    st.subheader("💡 Handlungsempfehlungen")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("""
+        **Sofort-Massnahmen:**
+        1. 🎯 Preisanpassung bei aggressiven Rabatten prüfen
+        2. 📝 Content-Gaps in Marketing-Strategie aufnehmen
+        3. 💰 Leasing-Konditionen überprüfen
+        4. 🚗 Lagerfahrzeuge mit Sonderkonditionen pushen
+        """)
+    
+    with col2:
+        st.markdown("""
+        **Mittelfristige Strategie:**
+        1. 📊 Wöchentliches Monitoring etablieren
+        2. 🤝 Kooperationen für bessere Konditionen
+        3. 🎨 Unique Selling Points stärken
+        4. 📱 Digital-First Ansatz verstärken
+        """)
+
+def render_keywords(display_data: Dict, fingerprint: str):
+    st.subheader("Keyword & Trend Analyse")
+    
+    kw_data = memoized(create_keyword_table, fingerprint, display_data)
+    
+    if not kw_data.empty:
+        # Create keyword frequency chart
+        fig = memoized(create_keyword_chart, fingerprint, kw_data)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Keyword table
+        st.dataframe(kw_data, use_container_width=True, hide_index=True)
+
+def trend_figure(store: SnapshotStore, metric: str, since, competitors, model, monthly: bool,
+                 title: str, y_title: str):
+    """Trend chart straight from the rollups; None without observations"""
+    rows = store.trend(metric, since, competitors=competitors, model=model, monthly=monthly)
+    return create_trend_chart(rows, title, y_title) if rows else None
+
+def render_trends(display_data: Dict, fingerprint: str):
+    st.subheader("Preis- & Rabatt-Trends")
+    store = get_store()
+    competitors = list(display_data)
+    
+    col1, col2 = st.columns(2)
+    period = col1.selectbox("Zeitraum", list(TREND_RANGES), index=1, key="trend_range")
+    monthly = col2.radio("Preisart", ["Kaufpreis", "Monatsrate"], horizontal=True, key="trend_kind") == "Monatsrate"
+    days = TREND_RANGES[period]
+    since = datetime.now() - timedelta(days=days) if days else None
+    # Rollups only change when a snapshot is recorded
+    key = f"{store.version()}:{period}:{monthly}:{','.join(competitors)}"
+    
+    fig = memoized(trend_figure, f"{key}:discount", store, 'discount', since, competitors, None, monthly,
+                   "Ø Rabatt pro Wettbewerber", "Ø Rabatt (%)")
+    if fig is None:
+        st.info("Noch keine Rabatt-Verläufe – sie entstehen mit jeder Aktualisierung.")
+    else:
+        st.plotly_chart(fig, use_container_width=True)
+    
+    models = store.models(competitors, monthly)
+    model = st.selectbox("Modell", models, key="trend_model") if models else None
+    if model:
+        fig = memoized(trend_figure, f"{key}:price:{model}", store, 'price', since, competitors, model, monthly,
+                       f"Ø Preis {model}", "Ø Preis (CHF/Mt)" if monthly else "Ø Preis (CHF)")
+        if fig is None:
+            st.caption("Für dieses Modell gibt es im Zeitraum keine Preise.")
+        else:
+            st.plotly_chart(fig, use_container_width=True)
+
+def render_details(display_data: Dict, fingerprint: str):
+    st.subheader("Detaillierte Wettbewerber-Daten")
+    
+    # Competitor selector
+    selected_comp = st.selectbox("Wettbewerber auswählen", list(display_data.keys()))
+    
+    if selected_comp and selected_comp in display_data:
+        comp_data = display_data[selected_comp]
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Anzahl Aktionen", len(comp_data.get('aktionen', [])))
+        col2.metric("Ø Rabatt", f"{comp_data.get('metrics', {}).get('avg_discount', 0):.1f}%")
+        col3.metric("Neue Angebote", comp_data.get('metrics', {}).get('new_this_week', 0))
+        
+        if comp_data.get('source') == 'stale':
+            st.warning(f"🟠 Letzter erfolgreicher Scan {format_age(comp_data.get('scraped_at'))} "
+                       f"({comp_data.get('last_update', 'N/A')}); letzte Abfrage fehlgeschlagen: {comp_data.get('error')}")
+        elif comp_data.get('scraped_at'):
+            st.caption(f"Stand: {format_age(comp_data['scraped_at'])}")
+        
+        if changes := comp_data.get('changes'):
+            st.caption(f"Seit letztem Scan: {len(changes['new'])} neu, "
+                       f"{len(changes['changed'])} geändert, {len(changes['removed'])} entfernt")
+        
+        # Offers of the selected competitor, one page of expanders at a time
+        st.subheader(f"Aktuelle Angebote - {selected_comp}")
+        offers = memoized(offers_frame, fingerprint, display_data)
+        index = memoized(build_offer_index, fingerprint, offers)
+        rows = index.match(**render_offer_filters(index, key="details"), competitors=[selected_comp])
+        page = render_pager(len(rows), DETAIL_PAGE_SIZE, key="details_page")
+        for i, aktion in enumerate(index.page(rows, page, DETAIL_PAGE_SIZE).itertuples(), page * DETAIL_PAGE_SIZE + 1):
+            with st.expander(f"{i}. {aktion.title}"):
+                col1, col2, col3 = st.columns(3)
+                col1.write(f"**Preis:** {aktion.price}")
+                col2.write(f"**Rabatt:** {aktion.discount}")
+                col3.write(f"**Typ:** {aktion.category}")
+        
+        # Keywords
+        if comp_data.get('keywords'):
+            st.subheader("Keywords")
+            st.write(', '.join([f"`{kw}`" for kw in comp_data.get('keywords', [])]))
+
+def render_diagnostics():
+    """Span timings of this process, scrape errors and metrics downloads"""
+    summary = TELEMETRY.summary()
+    if summary:
+        st.dataframe(summary, use_container_width=True, hide_index=True,
+                     column_config={'avg_ms': st.column_config.NumberColumn(format="%.1f"),
+                                    'max_ms': st.column_config.NumberColumn(format="%.1f")})
+    else:
+        st.caption("Noch keine Messungen in diesem Prozess")
+    
+    health = get_health().summary()
+    if health:
+        st.caption("Verbindungszustand pro Wettbewerber")
+        st.dataframe(health, use_container_width=True, hide_index=True,
+                     column_config={'p95_ms': st.column_config.NumberColumn(format="%.0f")})
+    
+    # Latest failure per competitor from refreshes run in this process
+    failures = {s.labels.get('competitor'): s.error for s in TELEMETRY.recent if s.name == 'scrape' and s.error}
+    for name, error in failures.items():
+        st.caption(f"⚠️ {name}: {error}")
+    
+    col1, col2 = st.columns(2)
+    col1.download_button("Prometheus", TELEMETRY.to_prometheus(), file_name="metrics.prom",
+                         mime="text/plain", use_container_width=True)
+    col2.download_button("JSON", TELEMETRY.to_json(), file_name="metrics.json",
+                         mime="application/json", use_container_width=True)
+
+# Dashboard sections in navigation order
+SECTIONS = {
+    "📊 Overview": render_overview,
+    "💰 Preisanalyse": render_prices,
+    "🎯 Alerts & Insights": render_alerts,
+    "📈 Keyword-Analyse": render_keywords,
+    "📉 Trends": render_trends,
+    "📋 Detailansicht": render_details,
+}
 
 def main():
     """Main Streamlit application"""
     
+    store = get_store()
+    data_cache = load_dashboard_data(store, get_health())
+    demo_mode = not any(d.get('source') in ('live', 'stale') for d in data_cache.values())
+    stale = [name for name, d in data_cache.items() if d.get('source') == 'stale']
+    last_update = max((d['scraped_at'] for d in data_cache.values() if d.get('scraped_at')), default=None)
+    
     # Header
     col1, col2, col3 = st.columns([2, 3, 1])
     with col1:
         st.title("🚗 AMAG Competitor Intelligence")
     with col2:
-        if st.session_state.last_update:
-            st.info(f"📊 Update: {st.session_state.last_update}")
+        if last_update:
+            st.info(f"📊 Update: {last_update.replace('T', ' ')}")
     with col3:
-        mode_badge = "🔴 Demo-Modus" if st.session_state.demo_mode else "🟢 Live-Daten"
+        mode_badge = "🔴 Demo-Modus" if demo_mode else "🟠 Teilweise veraltet" if stale else "🟢 Live-Daten"
         st.markdown(f"**Status:** {mode_badge}")
     
+    if stale:
+        st.warning("⚠️ Letzte Abfrage fehlgeschlagen, angezeigt wird der letzte gültige Stand: " +
+                   ", ".join(f"{name} ({format_age(data_cache[name].get('scraped_at'))})" for name in stale))
+    
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Dashboard Control")
         
         if st.button("🔄 Daten aktualisieren", type="primary", use_container_width=True):
             with st.spinner("Lade Daten..."):
-                scraper = CompetitorIntelligence()
+                mode, results = get_refresher().refresh(COMPETITORS)
                 data = {}
-                for name, config in COMPETITORS.items():
-                    data[name] = scraper.scrape_competitor(name, config)
-                
-                st.session_state.data_cache = data
-                st.session_state.last_update = datetime.now().strftime('%H:%M:%S')
+                progress = st.progress(0.0, text={
+                    'started': "Starte Abfrage...",
+                    'joined': "Aktualisierung läuft bereits, warte auf deren Ergebnis...",
+                    'fresh': "Daten wurden soeben aktualisiert",
+                }[mode])
+                for name, result in results:
+                    data[name] = result
+                    progress.progress(len(data) / len(COMPETITORS),
+                                      text=f"{name} geladen ({len(data)}/{len(COMPETITORS)})")
                 st.rerun()
         
         st.divider()
         
+        show_diagnostics = st.checkbox("🩺 Diagnose anzeigen")
+        
         # Filter options
         st.subheader("🎯 Filter")
         selected_competitors = st.multiselect(
@@ -381,196 +460,53 @@ def main():
         # Export section
         st.subheader("📥 Export")
         if st.button("JSON Export", use_container_width=True):
-            if st.session_state.data_cache:
-                json_data = export_json_data(st.session_state.data_cache)
+            if data_cache:
+                json_data = export_json_data(data_cache)
                 st.download_button(
                     label="💾 Download JSON",
                     data=json_data,
                     file_name=f"competitor_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                     mime="application/json"
                 )
-    
-    # Initialize with demo data if empty
-    if not st.session_state.data_cache:
-        st.session_state.data_cache = DEMO_DATA
-        st.session_state.last_update = datetime.now().strftime('%H:%M:%S')
+        
+        with st.expander("Verlauf exportieren"):
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS))
+            today = datetime.now().date()
+            date_range = st.date_input("Zeitraum", value=(today - timedelta(days=30), today))
+            if st.button("Export erstellen", use_container_width=True) and date_range:
+                since = datetime.combine(date_range[0], datetime.min.time())
+                until = datetime.combine(date_range[-1], datetime.min.time()) + timedelta(days=1)
+                mime, extension = EXPORT_FORMATS[export_format]
+                # Stream from the store to disk; only the finished file is handed to the browser
+                with tempfile.TemporaryFile() as out:
+                    count = export_snapshots(store, export_format, out, selected_competitors, since, until)
+                    out.seek(0)
+                    st.caption(f"{count} Datensätze")
+                    st.download_button(
+                        label=f"💾 Download {export_format.upper()}",
+                        data=out.read(),
+                        file_name=f"competitor_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                        mime=mime
+                    )
     
     # Filter data
-    display_data = {k: v for k, v in st.session_state.data_cache.items() 
+    display_data = {k: v for k, v in data_cache.items() 
                     if k in selected_competitors}
     if not show_amag and 'AMAG' in display_data:
         display_data.pop('AMAG')
+    fingerprint = data_fingerprint(display_data)
     
-    # Main content area with tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "📊 Overview", 
-        "💰 Preisanalyse", 
-        "🎯 Alerts & Insights",
-        "📈 Keyword-Analyse",
-        "📋 Detailansicht"
-    ])
-    
-    with tab1:
-        # Key metrics
-        st.subheader("Key Performance Indicators")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        total_offers = sum(len(d.get('aktionen', [])) for d in display_data.values())
-        avg_discount = sum(d.get('metrics', {}).get('avg_discount', 0) for d in display_data.values()) / max(len(display_data), 1)
-        new_offers = sum(d.get('metrics', {}).get('new_this_week', 0) for d in display_data.values())
-        
-        col1.metric("Total Aktionen", total_offers, delta=f"+{new_offers} neu")
-        col2.metric("Ø Rabatt", f"{avg_discount:.1f}%", delta="2.3%")
-        col3.metric("Aktive Wettbewerber", len(display_data))
-        col4.metric("Keywords erkannt", sum(len(d.get('keywords', [])) for d in display_data.values()))
-        
-        st.divider()
-        
-        # Competitor overview table
-        st.subheader("Wettbewerber-Übersicht")
-        
-        overview_data = []
-        for comp, data in display_data.items():
-            overview_data.append({
-                'Wettbewerber': comp,
-                'Anzahl Aktionen': len(data.get('aktionen', [])),
-                'Top-Angebot': data.get('aktionen', [{}])[0].get('title', 'N/A')[:50] + '...' if data.get('aktionen') else 'N/A',
-                'Niedrigster Preis': min([a.get('price', 'N/A') for a in data.get('aktionen', [{'price': 'N/A'}])]),
-                'Datenquelle': '🟢 Live' if data.get('source') == 'live' else '🔴 Demo',
-                'Update': data.get('last_update', 'N/A')
-            })
-        
-        df = pd.DataFrame(overview_data)
-        st.dataframe(df, use_container_width=True, hide_index=True)
+    # Only the selected section is computed; the others cost nothing per rerun
+    view = st.radio("Ansicht", list(SECTIONS), horizontal=True, label_visibility="collapsed", key="view")
+    with span('section', view=view):
+        SECTIONS[view](display_data, fingerprint)
     
-    with tab2:
-        st.subheader("Preisvergleich & Rabattanalyse")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Price comparison chart
-            if display_data:
-                fig = create_price_comparison_chart(display_data)
-                st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Discount heatmap
-            if display_data:
-                fig = create_discount_heatmap(display_data)
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # Price table
-        st.subheader("Detaillierte Preisübersicht")
-        price_data = []
-        for comp, data in display_data.items():
-            for aktion in data.get('aktionen', []):
-                price_data.append({
-                    'Wettbewerber': comp,
-                    'Angebot': aktion.get('title', 'N/A'),
-                    'Preis': aktion.get('price', 'N/A'),
-                    'Rabatt': aktion.get('discount', 'N/A'),
-                    'Kategorie': aktion.get('type', 'N/A')
-                })
-        
-        if price_data:
-            price_df = pd.DataFrame(price_data)
-            st.dataframe(price_df, use_container_width=True, hide_index=True)
-    
-    with tab3:
-        st.subheader("🚨 Competitive Alerts & Intelligence")
-        
-        alerts = generate_competitive_alerts(display_data)
-        
-        if alerts:
-            for alert in alerts:
-                if alert['level'] == 'critical':
-                    st.error(f"{alert['icon']} {alert['message']}")
-                elif alert['level'] == 'warning':
-                    st.warning(f"{alert['icon']} {alert['message']}")
-                else:
-                    st.info(f"{alert['icon']} {alert['message']}")
-        else:
-            st.success("✅ Keine kritischen Wettbewerber-Aktivitäten erkannt")
-        
-        st.divider()
-        
-        # Recommendations
-        st.subheader("💡 Handlungsempfehlungen")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("""
-            **Sofort-Massnahmen:**
-            1. 🎯 Preisanpassung bei aggressiven Rabatten prüfen
-            2. 📝 Content-Gaps in Marketing-Strategie aufnehmen
-            3. 💰 Leasing-Konditionen überprüfen
-            4. 🚗 Lagerfahrzeuge mit Sonderkonditionen pushen
-            """)
-        
-        with col2:
-            st.markdown("""
-            **Mittelfristige Strategie:**
-            1. 📊 Wöchentliches Monitoring etablieren
-            2. 🤝 Kooperationen für bessere Konditionen
-            3. 🎨 Unique Selling Points stärken
-            4. 📱 Digital-First Ansatz verstärken
-            """)
-    
-    with tab4:
-        st.subheader("Keyword & Trend Analyse")
-        
-        # Collect all keywords
-        all_keywords = {}
-        for comp, data in display_data.items():
-            for kw in data.get('keywords', []):
-                if kw not in all_keywords:
-                    all_keywords[kw] = []
-                all_keywords[kw].append(comp)
-        
-        if all_keywords:
-            # Create keyword frequency chart
-            kw_data = pd.DataFrame([
-                {'Keyword': kw, 'Häufigkeit': len(comps), 'Wettbewerber': ', '.join(comps)}
-                for kw, comps in all_keywords.items()
-            ]).sort_values('Häufigkeit', ascending=False)
-            
-            fig = px.bar(kw_data.head(10), x='Häufigkeit', y='Keyword', 
-                        orientation='h', title='Top 10 Keywords im Markt')
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Keyword table
-            st.dataframe(kw_data, use_container_width=True, hide_index=True)
-    
-    with tab5:
-        st.subheader("Detaillierte Wettbewerber-Daten")
-        
-        # Competitor selector
-        selected_comp = st.selectbox("Wettbewerber auswählen", list(display_data.keys()))
-        
-        if selected_comp and selected_comp in display_data:
-            comp_data = display_data[selected_comp]
-            
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Anzahl Aktionen", len(comp_data.get('aktionen', [])))
-            col2.metric("Ø Rabatt", f"{comp_data.get('metrics', {}).get('avg_discount', 0):.1f}%")
-            col3.metric("Neue Angebote", comp_data.get('metrics', {}).get('new_this_week', 0))
-            
-            # Show all offers
-            st.subheader(f"Aktuelle Angebote - {selected_comp}")
-            for i, aktion in enumerate(comp_data.get('aktionen', []), 1):
-                with st.expander(f"{i}. {aktion.get('title', 'N/A')}"):
-                    col1, col2, col3 = st.columns(3)
-                    col1.write(f"**Preis:** {aktion.get('price', 'N/A')}")
-                    col2.write(f"**Rabatt:** {aktion.get('discount', 'N/A')}")
-                    col3.write(f"**Typ:** {aktion.get('type', 'N/A')}")
-            
-            # Keywords
-            if comp_data.get('keywords'):
-                st.subheader("Keywords")
-                st.write(', '.join([f"`{kw}`" for kw in comp_data.get('keywords', [])]))
+    # Rendered last so the panel includes this rerun's spans
+    if show_diagnostics:
+        with st.sidebar:
+            st.divider()
+            st.subheader("🩺 Diagnose")
+            render_diagnostics()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+"""
+AMAG Competitor Intelligence Archive
+Content-addressed, gzip-compressed store of every fetched page body
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+# zlib's default level: close to level 9's ratio on HTML at a fraction of the CPU
+ARCHIVE_COMPRESSLEVEL = 6
+
+
+def content_digest(content: bytes) -> str:
+    """Archive key of a page body; the same SHA-256 the HTTP cache compares"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageArchive:
+    """One file per distinct body under ``root/ab/cdef….gz``.
+
+    Identical bodies, whether refetched unchanged or served by several URLs,
+    are stored once. Files are written atomically and never modified, so
+    readers in other processes need no locking.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.gz"
+
+    def put(self, content: bytes, digest: Optional[str] = None) -> str:
+        """Store ``content`` unless already archived; returns its digest"""
+        digest = digest or content_digest(content)
+        path = self.path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(gzip.compress(content, ARCHIVE_COMPRESSLEVEL, mtime=0))
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Page body, None if it was never archived"""
+        try:
+            return gzip.decompress(self.path(digest).read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def __iter__(self) -> Iterator[str]:
+        for path in self.root.glob('??/*.gz'):
+            yield path.parent.name + path.name[:-len('.gz')]
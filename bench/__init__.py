@@ -0,0 +1,4 @@
+"""
+AMAG Competitor Intelligence Benchmarks
+Offline per-stage timings against recorded and synthetic dealer pages
+"""
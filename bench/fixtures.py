@@ -0,0 +1,87 @@
+"""
+Benchmark fixtures: recorded dealer pages and deterministic synthetic ones
+"""
+
+import random
+from pathlib import Path
+from typing import Dict, List
+
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+
+_MODELS = ['VW Golf 8', 'VW ID.4', 'Audi A3 Sportback', 'Audi Q5', 'Skoda Octavia Combi',
+           'SEAT Leon FR', 'Cupra Born', 'Toyota Yaris Hybrid', 'Mazda CX-5', 'Ford Kuga',
+           'Mercedes A-Klasse', 'BMW 3er Touring', 'Hyundai Kona Elektro', 'Kia Sportage']
+_CAMPAIGNS = ['Winteraktion', 'Top-Leasing', 'Lagerräumung', 'Elektro-Bonus', 'Business Paket',
+              'Young Driver', 'Ökoprämie', 'Gratis-Service']
+_FILLER = ('Unsere Fahrzeuge überzeugen mit Qualität und Service. Leasing und Finanzierung '
+           'nach Mass, Probefahrt jederzeit möglich. ')
+
+
+def load_corpus() -> Dict[str, bytes]:
+    """Recorded dealer pages shipped with the benchmarks"""
+    return {path.stem: path.read_bytes() for path in sorted(CORPUS_DIR.glob('*.html'))}
+
+
+def synthetic_page(seed: int, offers: int = 12, target_bytes: int = 0) -> bytes:
+    """Dealer-like offer page; padded with navigation and prose up to ``target_bytes``"""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(offers):
+        model = rng.choice(_MODELS)
+        campaign = rng.choice(_CAMPAIGNS)
+        discount = rng.choice(['', f' {rng.randint(5, 30)}%'])
+        if rng.random() < 0.25:
+            price = f"CHF {rng.randint(199, 899)}/Mt"
+        else:
+            price = f"CHF {rng.randint(15, 80)}'{rng.randint(0, 9)}00.–"
+        cards.append(
+            f'<article class="offer-card"><h3 class="title">{model} – {campaign}{discount}</h3>'
+            f'<span class="price">{price}</span><p>{_FILLER}</p>'
+            f'<a href="/angebote/{seed}-{i}">Details</a></article>'
+        )
+    body = ''.join(cards)
+
+    padding = []
+    size = len(body)
+    while size < target_bytes:
+        chunk = (f'<div class="teaser"><h4>{rng.choice(_MODELS)}</h4><p>{_FILLER * 4}</p>'
+                 f'<script>var t{len(padding)} = "{rng.random()}";</script></div>')
+        padding.append(chunk)
+        size += len(chunk.encode('utf-8'))
+
+    return (
+        '<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"><title>Angebote</title>'
+        '<style>.price{font-weight:700}</style></head><body>'
+        '<nav><h2>Neuwagen</h2><h2>Occasionen</h2><h2>Service</h2></nav>'
+        f'<main><h1>Aktionen</h1><section class="offers">{body}</section>{"".join(padding)}</main>'
+        '</body></html>'
+    ).encode('utf-8')
+
+
+def page_mix(count: int, seed: int = 0) -> List[bytes]:
+    """Recorded pages, small synthetic pages and a few 1-3 MB pages"""
+    rng = random.Random(seed)
+    corpus = list(load_corpus().values())
+    pages = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.2 and corpus:
+            pages.append(corpus[i % len(corpus)])
+        elif roll < 0.95:
+            pages.append(synthetic_page(seed + i, offers=rng.randint(4, 24), target_bytes=60_000))
+        else:
+            pages.append(synthetic_page(seed + i, offers=40, target_bytes=rng.randint(1, 3) * 1_000_000))
+    return pages
+
+
+def make_competitors(count: int, base_url: str) -> Dict[str, Dict]:
+    """Registry entries pointing at the stand-in server"""
+    return {
+        f"Händler {i:04d}": {
+            'url': base_url,
+            'aktionen_url': f"{base_url}/dealer/{i}",
+            'selector_title': 'h1, h2, h3, .title',
+            'selector_price': '.price, .preis, span[class*="price"]',
+        }
+        for i in range(count)
+    }
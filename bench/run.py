@@ -0,0 +1,175 @@
+"""
+Benchmark runner: per-stage timings and memory peaks at several competitor counts
+
+    python -m bench.run                          # 4, 100 and 1000 competitors
+    python -m bench.run --sizes 4 100 --repeat 5 --output results.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from archive import PageArchive  # noqa: E402
+from bench.fixtures import make_competitors, page_mix  # noqa: E402
+from bench.server import StandInServer  # noqa: E402
+from health import HealthRegistry  # noqa: E402
+from intelligence import CompetitorIntelligence, HttpCache  # noqa: E402
+from offers import offers_frame  # noqa: E402
+from politeness import Politeness  # noqa: E402
+from views import (  # noqa: E402
+    create_discount_heatmap,
+    create_keyword_chart,
+    create_keyword_table,
+    create_overview_table,
+    create_price_comparison_chart,
+    create_price_table,
+    export_json_data,
+    generate_competitive_alerts,
+)
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+def measure(stage: str, competitors: int, fn: Callable, repeat: int) -> Dict:
+    """Time ``fn`` ``repeat`` times, then once more under tracemalloc for its peak"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'stage': stage, 'competitors': competitors, 'repeat': repeat,
+            'median_s': statistics.median(timings), 'min_s': min(timings),
+            'peak_kib': round(peak / 1024, 1)}
+
+
+def measure_once(stage: str, competitors: int, fn: Callable) -> Dict:
+    """Single run for stages with side effects (network, caches).
+
+    Tracing allocations would slow the threaded fetch several-fold, so these
+    stages report the process RSS high-water mark instead of a traced peak.
+    """
+    started = time.perf_counter()
+    extra = fn() or {}
+    elapsed = time.perf_counter() - started
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    return {'stage': stage, 'competitors': competitors, 'repeat': 1,
+            'median_s': elapsed, 'min_s': elapsed, 'peak_kib': None, 'rss_high_water_kib': rss, **extra}
+
+
+def bench_size(n: int, args, cache_dir: Path) -> List[Dict]:
+    pages = page_mix(n, seed=args.seed)
+    results = []
+
+    with StandInServer(pages, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+                       seed=args.seed) as server:
+        competitors = make_competitors(n, server.base_url)
+        scraper = CompetitorIntelligence(http_cache=HttpCache(cache_dir / f"http_cache_{n}.json"),
+                                         health=HealthRegistry(cache_dir / f"health_{n}.json"),
+                                         archive=PageArchive(cache_dir / f"pages_{n}"))
+        # One local host stands in for many: lift the per-host politeness limits
+        scraper.politeness = Politeness(scraper._fetch_robots, scraper.headers['User-Agent'],
+                                        rate=1e9, burst=10**9, concurrency=args.workers)
+        scraper.session.mount('http://', HTTPAdapter(pool_maxsize=args.workers))
+
+        def fetch():
+            sources = [r.get('source') for _, r in scraper.scrape_all(
+                competitors, max_workers=args.workers, deadline=args.deadline)]
+            return {'live': sources.count('live'), 'fallback': len(sources) - sources.count('live')}
+
+        results.append(measure_once('fetch_cold', n, fetch))
+        results.append(measure_once('fetch_revalidate', n, fetch))
+
+    config = next(iter(competitors.values()))
+    results.append(measure('parse_lxml', n, lambda: [scraper._extract_lxml(config, p) for p in pages],
+                           args.repeat))
+    if n <= args.soup_max:
+        results.append(measure('parse_soup', n, lambda: [scraper._extract_soup(config, p) for p in pages],
+                               args.repeat))
+
+    texts = [scraper._extract_lxml(config, p)[3] for p in pages]
+    results.append(measure('keywords', n, lambda: [scraper._match_keywords(t) for t in texts], args.repeat))
+
+    data = {name: scraper._parse_page(config, page) or {'aktionen': [], 'source': 'demo'}
+            for name, page in zip(competitors, pages)}
+    data['AMAG'] = data.pop(next(iter(competitors)))  # Own offers for reference rules
+    offers = offers_frame(data)
+
+    results.append(measure('offers_frame', n, lambda: offers_frame(data), args.repeat))
+    results.append(measure('alerts', n, lambda: generate_competitive_alerts(data, offers), args.repeat))
+    results.append(measure('charts', n, lambda: (
+        create_price_comparison_chart(offers),
+        create_discount_heatmap(offers),
+        create_keyword_chart(create_keyword_table(data)),
+    ), args.repeat))
+    results.append(measure('tables', n, lambda: (
+        create_overview_table(data, offers),
+        create_price_table(offers),
+        create_keyword_table(data),
+    ), args.repeat))
+    results.append(measure('export_json', n, lambda: export_json_data(data), args.repeat))
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the scraping and dashboard pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 100, 1000], help='competitor counts')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per CPU stage')
+    parser.add_argument('--workers', type=int, default=32, help='fetch workers')
+    parser.add_argument('--deadline', type=float, default=120, help='fetch deadline in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='share of dealers answering 500')
+    parser.add_argument('--timeout-rate', type=float, default=0.02, help='share of dealers that hang')
+    parser.add_argument('--soup-max', type=int, default=100, help='largest size to run the soup parser at')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='results file (default: bench/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            for row in bench_size(n, args, Path(tmp)):
+                results.append(row)
+                peak = (f"peak {row['peak_kib'] / 1024:7.1f} MiB" if row['peak_kib'] is not None
+                        else f"rss  {row['rss_high_water_kib'] / 1024:7.1f} MiB")
+                print(f"{row['stage']:<18} n={n:<5} median {row['median_s'] * 1000:9.1f} ms   {peak}", flush=True)
+
+    output = args.output or RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'args': {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}},
+        'results': results,
+    }, indent=2), encoding='utf-8')
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Local HTTP stand-in for dealer sites with injectable latency, errors and timeouts
+"""
+
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+
+class StandInServer:
+    """Serves ``/dealer/<i>`` from a page list; faults are fixed per dealer via ``seed``"""
+
+    def __init__(self, pages: List[bytes], latency: Tuple[float, float] = (0.01, 0.05),
+                 error_rate: float = 0.05, timeout_rate: float = 0.02, hang_seconds: float = 4.0,
+                 seed: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.seed = seed
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fault(self, dealer: int) -> str:
+        """'ok', 'error' or 'timeout' for a dealer, stable across runs"""
+        roll = random.Random(f"{self.seed}:{dealer}").random()
+        if roll < self.timeout_rate:
+            return 'timeout'
+        if roll < self.timeout_rate + self.error_rate:
+            return 'error'
+        return 'ok'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if self.path == '/robots.txt':
+                    return self._send(200, b'User-agent: *\nAllow: /\n')
+                try:
+                    dealer = int(self.path.rstrip('/').rsplit('/', 1)[-1].split('?')[0])
+                except ValueError:
+                    return self._send(404, b'not found')
+
+                fault = server.fault(dealer)
+                rng = random.Random(f"{server.seed}:{dealer}:latency")
+                time.sleep(rng.uniform(*server.latency))
+                if fault == 'timeout':
+                    time.sleep(server.hang_seconds)
+                elif fault == 'error':
+                    return self._send(500, b'internal error')
+
+                page = server.pages[dealer % len(server.pages)]
+                etag = '"' + hashlib.sha1(page).hexdigest()[:16] + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send(304, b'', etag)
+                self._send(200, page, etag)
+
+            def _send(self, status: int, body: bytes, etag: str = None):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    if etag:
+                        self.send_header('ETag', etag)
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (timeout injection)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> 'StandInServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,200 @@
+"""
+AMAG Competitor Intelligence Crawl
+Bounded per-competitor frontier over offer listings, pagination and detail pages
+"""
+
+import codecs
+import hashlib
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
+from politeness import host_of
+
+# Budgets per competitor and refresh; dealers.csv can override them per row
+CRAWL_MAX_DEPTH = 1     # detail-link hops from a listing page (pagination keeps the depth)
+CRAWL_MAX_PAGES = 5     # pages fetched, listing and detail pages together
+CRAWL_MAX_OFFERS = 200  # offers kept after deduplication
+
+# Pagination links followed when a dealer configures no selector_next
+DEFAULT_NEXT_SELECTOR = 'a[rel="next"], link[rel="next"]'
+
+# Ancestor levels searched for the card that holds both a title and its price
+CARD_MAX_LEVELS = 4
+
+
+def crawl_budget(config: Dict) -> Tuple[int, int]:
+    """(max_depth, max_pages) for a dealer config"""
+    return (int(config.get('max_depth', CRAWL_MAX_DEPTH)),
+            int(config.get('max_pages', CRAWL_MAX_PAGES)))
+
+
+def normalize_url(href: str, base: str) -> Optional[str]:
+    """Absolute http(s) URL without fragment, lower-cased scheme and host; None for other links"""
+    url, _ = urldefrag(urljoin(base, href.strip()))
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+def same_site(url: str, root: str) -> bool:
+    """Same host as ``root``, ignoring a leading 'www.'"""
+    return host_of(url).removeprefix('www.') == host_of(root).removeprefix('www.')
+
+
+class UrlSeenSet:
+    """Visited-URL set holding 8-byte digests instead of the URLs themselves"""
+
+    def __init__(self):
+        self._digests = set()
+
+    @staticmethod
+    def _digest(url: str) -> bytes:
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+    def add(self, url: str) -> bool:
+        """Record ``url``; False if it was already seen"""
+        digest = self._digest(url)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._digest(url) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class CrawlFrontier:
+    """Breadth-first queue of same-site pages bounded by depth and page budgets.
+
+    Pagination links stay at the depth of the listing they were found on, so
+    ``max_pages`` bounds how far a listing is paged; offer detail links add a
+    level and are only followed up to ``max_depth``.
+    """
+
+    def __init__(self, start_url: str, max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES):
+        self.root = start_url
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.seen = UrlSeenSet()
+        self.fetched = 0
+        self._queue: deque = deque()
+        self._push(start_url, 0)
+
+    def _push(self, url: str, depth: int):
+        if depth <= self.max_depth and self.seen.add(url):
+            self._queue.append((url, depth))
+
+    def add_links(self, page_url: str, pagination: Iterable[str], details: Iterable[str], depth: int):
+        """Queue links found on ``page_url`` (fetched at ``depth``)"""
+        for hrefs, link_depth in ((pagination, depth), (details, depth + 1)):
+            for href in hrefs:
+                url = normalize_url(href, page_url)
+                if url and same_site(url, self.root):
+                    self._push(url, link_depth)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        while self._queue and self.fetched < self.max_pages:
+            self.fetched += 1
+            yield self._queue.popleft()
+
+
+def pair_offers(titles: List, prices: List, cards: List, parent_of: Callable, text_of: Callable,
+                max_levels: int = CARD_MAX_LEVELS) -> List[Tuple[str, Optional[str]]]:
+    """Pair each offer title with the price from the same card.
+
+    Works on lxml and BeautifulSoup elements alike via ``parent_of`` and
+    ``text_of``. With card elements, each card contributes its first title and
+    price. Without them, a title takes the price whose nearest ancestors it
+    shares, as long as that ancestor holds no other price. Titles outside any
+    card (navigation headings) are dropped unless nothing pairs at all.
+    """
+    titles, prices = _unique(titles), _unique(prices)
+
+    if cards:
+        card_ids = {id(card): i for i, card in enumerate(_unique(cards))}
+        card_titles: Dict[int, str] = {}
+        card_prices: Dict[int, str] = {}
+        for elements, found in ((titles, card_titles), (prices, card_prices)):
+            for el in elements:
+                node = el
+                while node is not None and id(node) not in card_ids:
+                    node = parent_of(node)
+                if node is not None:
+                    found.setdefault(card_ids[id(node)], text_of(el))
+        if card_titles:
+            return _dedupe([(card_titles[i], card_prices.get(i)) for i in sorted(card_titles)])
+
+    # Ancestor -> price text; None once a second price shares the ancestor
+    owner: Dict[int, Optional[str]] = {}
+    ancestors = []  # lxml hands out the same proxy, and id, only while one is alive
+    for el in prices:
+        text = text_of(el)
+        node = parent_of(el)
+        for _ in range(max_levels):
+            if node is None:
+                break
+            ancestors.append(node)
+            owner[id(node)] = None if id(node) in owner else text
+            node = parent_of(node)
+
+    paired = []
+    for el in titles:
+        node = parent_of(el)
+        for _ in range(max_levels):
+            if node is None or id(node) in owner:
+                break
+            node = parent_of(node)
+        price = owner.get(id(node)) if node is not None else None
+        if price:
+            paired.append((text_of(el), price))
+    if paired:
+        return _dedupe(paired)
+    return _dedupe([(text_of(el), None) for el in titles])
+
+
+def html_encoding(content: bytes) -> str:
+    """Encoding of a page: byte order mark, declared charset, else UTF-8 if it decodes, else Windows-1252.
+
+    The order BeautifulSoup follows, minus its statistical guess, which is
+    slow on large pages and rarely needed once UTF-8 has been tried.
+    """
+    from bs4.dammit import EncodingDetector
+
+    _, encoding = EncodingDetector.strip_byte_order_mark(content)
+    encoding = encoding or EncodingDetector.find_declared_encoding(content, is_html=True)
+    if encoding:
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            pass  # Unknown declared charset
+    try:
+        content.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+
+def parse_html(content: bytes):
+    """lxml tree of a page decoded per html_encoding.
+
+    lxml alone reads pages without a charset declaration as Latin-1, so UTF-8
+    umlauts would come out garbled ('LagerrÃ¤umung'). Raises lxml's
+    ParserError or ValueError for empty or broken documents.
+    """
+    import lxml.html
+
+    return lxml.html.fromstring(content, parser=lxml.html.HTMLParser(encoding=html_encoding(content)))
+
+
+def _unique(elements: List) -> List:
+    seen = set()
+    return [el for el in elements if not (id(el) in seen or seen.add(id(el)))]
+
+
+def _dedupe(pairs: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+    return [pair for pair in dict.fromkeys(pairs) if pair[0]]
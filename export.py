@@ -0,0 +1,130 @@
+"""
+AMAG Competitor Intelligence Export
+Streaming NDJSON, CSV and Parquet exports straight from the snapshot store
+
+    python export.py --format parquet --since 2026-01-01 -o offers.parquet
+    python export.py --format ndjson --competitor "Emil Frey" -o - | head
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from intelligence import SnapshotStore
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# One row per offer and snapshot in CSV and Parquet exports
+OFFER_EXPORT_COLUMNS = ['scraped_at', 'competitor', 'source', 'title', 'price', 'amount', 'currency',
+                        'monthly', 'discount', 'discount_pct', 'category', 'first_seen']
+
+PARQUET_CHUNK_ROWS = 10_000
+
+
+def iter_offer_rows(snapshots: Iterable[Dict]) -> Iterator[Dict]:
+    """Flatten snapshots into offer rows"""
+    for snapshot in snapshots:
+        for aktion in snapshot.get('aktionen', []):
+            yield {
+                'scraped_at': snapshot['scraped_at'],
+                'competitor': snapshot['competitor'],
+                'source': snapshot.get('source'),
+                'title': aktion.get('title'),
+                'price': aktion.get('price'),
+                'amount': aktion.get('amount'),
+                'currency': aktion.get('currency'),
+                'monthly': aktion.get('monthly'),
+                'discount': aktion.get('discount'),
+                'discount_pct': aktion.get('discount_pct'),
+                'category': aktion.get('type'),
+                'first_seen': aktion.get('first_seen'),
+            }
+
+
+def write_ndjson(snapshots: Iterable[Dict], out: BinaryIO) -> int:
+    """One JSON snapshot per line"""
+    count = 0
+    for snapshot in snapshots:
+        out.write(json.dumps(snapshot, ensure_ascii=False).encode('utf-8') + b'\n')
+        count += 1
+    return count
+
+
+def write_csv(snapshots: Iterable[Dict], out: BinaryIO) -> int:
+    """Offer rows as UTF-8 CSV with header"""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    try:
+        writer = csv.DictWriter(text, fieldnames=OFFER_EXPORT_COLUMNS)
+        writer.writeheader()
+        count = 0
+        for row in iter_offer_rows(snapshots):
+            writer.writerow(row)
+            count += 1
+        return count
+    finally:
+        text.detach()
+
+
+def write_parquet(snapshots: Iterable[Dict], out: BinaryIO, chunk_rows: int = PARQUET_CHUNK_ROWS) -> int:
+    """Offer rows as Parquet, one row group per ``chunk_rows`` offers"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('scraped_at', pa.string()), ('competitor', pa.string()), ('source', pa.string()),
+        ('title', pa.string()), ('price', pa.string()), ('amount', pa.float64()),
+        ('currency', pa.string()), ('monthly', pa.bool_()), ('discount', pa.string()),
+        ('discount_pct', pa.float64()), ('category', pa.string()), ('first_seen', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema, compression='zstd') as writer:
+        chunk: List[Dict] = []
+        for row in iter_offer_rows(snapshots):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+                chunk = []
+        if chunk or not count:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {'ndjson': write_ndjson, 'csv': write_csv, 'parquet': write_parquet}
+
+
+def export_snapshots(store: SnapshotStore, fmt: str, out: BinaryIO, competitors: Optional[List[str]] = None,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+    """Stream matching snapshots from the store into ``out``; returns records written"""
+    return WRITERS[fmt](store.iter_snapshots(competitors, since, until), out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export stored snapshots')
+    parser.add_argument('--format', choices=list(WRITERS), default='ndjson')
+    parser.add_argument('--competitor', action='append', help='repeat to export several competitors')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='ISO date/time, inclusive')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='ISO date/time, exclusive')
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    args = parser.parse_args()
+
+    store = SnapshotStore()
+    if args.output == '-':
+        count = export_snapshots(store, args.format, sys.stdout.buffer, args.competitor, args.since, args.until)
+    else:
+        with open(args.output, 'wb') as out:
+            count = export_snapshots(store, args.format, out, args.competitor, args.since, args.until)
+    print(f"{count} records exported", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
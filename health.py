@@ -0,0 +1,206 @@
+"""
+AMAG Competitor Intelligence Health
+Per-competitor fetch health: circuit breakers, adaptive timeouts and a retry budget
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Circuit breaker: consecutive failed scrapes before a competitor is skipped
+BREAKER_FAILURES = 3
+BREAKER_BACKOFF = 300.0           # seconds open after the first trip, doubled per re-trip
+BREAKER_MAX_BACKOFF = 6 * 3600.0
+
+# Adaptive timeouts: a multiple of the competitor's p95 latency, within bounds
+LATENCY_SAMPLES = 50
+TIMEOUT_PERCENTILE = 0.95
+TIMEOUT_FACTOR = 3.0
+TIMEOUT_MIN = 1.0
+TIMEOUT_MAX = 10.0
+TIMEOUT_MIN_SAMPLES = 5           # below this the default timeout applies
+
+# Retries per refresh: RETRY_RATIO of all requests, but at least RETRY_MIN
+RETRY_RATIO = 0.1
+RETRY_MIN = 3
+
+HISTORY_LENGTH = 20               # scrape outcomes kept per competitor
+
+# Scrape errors that mean the host is unreachable or overloaded; only these
+# count toward the breaker. Extraction outcomes (NoOffersFound, HTTP404,
+# robots.txt PermissionError) are recorded but leave the circuit closed.
+TRANSPORT_ERRORS = {'ConnectionError', 'ConnectTimeout', 'ReadTimeout', 'Timeout', 'SSLError',
+                    'ProxyError', 'ChunkedEncodingError'}
+
+
+def is_transport_failure(error: Optional[str]) -> bool:
+    """True for timeouts, connection errors, HTTP 5xx and HTTP 429"""
+    if error in TRANSPORT_ERRORS:
+        return True
+    status = error[4:] if error and error.startswith('HTTP') else ''
+    return status.isdigit() and (int(status) == 429 or int(status) >= 500)
+
+
+@dataclass
+class CompetitorHealth:
+    """Fetch history of one competitor"""
+    latencies: List[float] = field(default_factory=list)
+    failures: int = 0             # consecutive failed scrapes
+    trips: int = 0                # consecutive circuit openings, drives the backoff
+    open_until: float = 0.0       # epoch seconds
+    last_success: Optional[str] = None
+    last_error: Optional[str] = None
+    history: List[List] = field(default_factory=list)  # [timestamp, error or None]
+
+    def state(self, now: float) -> str:
+        if self.open_until > now:
+            return 'open'
+        return 'half-open' if self.trips else 'closed'
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HealthRegistry:
+    """Thread-safe health records for all competitors, persisted as JSON"""
+
+    def __init__(self, path: Optional[Path]):
+        """``path=None`` keeps records in memory only; reload() and flush() are then no-ops"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._mtime = None
+        self._records: Dict[str, CompetitorHealth] = {}
+        self.reload()
+
+    def reload(self):
+        """Re-read the file when another process (the scheduler) has written it"""
+        if self.path is None:
+            return
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._mtime or self._dirty:
+                return
+            try:
+                stored = json.loads(self.path.read_text(encoding='utf-8'))
+                self._records = {name: CompetitorHealth(**record) for name, record in stored.items()}
+                # Circuits opened by extraction errors before only transport failures counted
+                for record in self._records.values():
+                    if record.open_until and not is_transport_failure(record.last_error):
+                        record.failures = record.trips = 0
+                        record.open_until = 0.0
+            except (OSError, ValueError, TypeError):
+                self._records = {}
+            self._mtime = mtime
+
+    def _get(self, name: str) -> CompetitorHealth:
+        record = self._records.get(name)
+        if record is None:
+            record = self._records[name] = CompetitorHealth()
+        return record
+
+    def allow(self, name: str) -> bool:
+        """False while the competitor's circuit is open; half-open lets one probe through"""
+        with self._lock:
+            return self._get(name).state(time.time()) != 'open'
+
+    def timeout(self, name: str, default: float) -> float:
+        """Request timeout from the competitor's observed latency"""
+        with self._lock:
+            record = self._get(name)
+            if len(record.latencies) < TIMEOUT_MIN_SAMPLES:
+                return default
+            p95 = record.latency_percentile(TIMEOUT_PERCENTILE)
+        return min(TIMEOUT_MAX, max(TIMEOUT_MIN, p95 * TIMEOUT_FACTOR))
+
+    def observe_latency(self, name: str, seconds: float):
+        with self._lock:
+            record = self._get(name)
+            record.latencies = (record.latencies + [round(seconds, 4)])[-LATENCY_SAMPLES:]
+            self._dirty = True
+
+    def record(self, name: str, error: Optional[str] = None):
+        """Outcome of one scrape; transport failures trip the breaker with exponential backoff"""
+        now = time.time()
+        stamp = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            record = self._get(name)
+            record.history = (record.history + [[stamp, error]])[-HISTORY_LENGTH:]
+            if not is_transport_failure(error):
+                # The host answered, so the circuit closes even if the page yielded nothing
+                record.failures = record.trips = 0
+                record.open_until = 0.0
+                if error is None:
+                    record.last_success = stamp
+                record.last_error = error
+            else:
+                record.failures += 1
+                record.last_error = error
+                # A failed half-open probe re-opens at once, with a longer backoff
+                if record.trips or record.failures >= BREAKER_FAILURES:
+                    backoff = min(BREAKER_MAX_BACKOFF, BREAKER_BACKOFF * 2 ** record.trips)
+                    record.open_until = now + backoff * random.uniform(0.9, 1.1)
+                    record.trips += 1
+            self._dirty = True
+
+    def last_error(self, name: str) -> Optional[str]:
+        with self._lock:
+            record = self._records.get(name)
+            return record.last_error if record else None
+
+    def summary(self) -> List[Dict]:
+        """One row per competitor for the diagnostics panel"""
+        now = time.time()
+        with self._lock:
+            return [{'competitor': name, 'state': r.state(now), 'failures': r.failures,
+                     'p95_ms': (r.latency_percentile(TIMEOUT_PERCENTILE) or 0) * 1000,
+                     'open_until': (datetime.fromtimestamp(r.open_until).isoformat(timespec='seconds')
+                                    if r.open_until > now else None),
+                     'last_success': r.last_success, 'last_error': r.last_error}
+                    for name, r in sorted(self._records.items())]
+
+    def flush(self):
+        """Persist pending changes atomically"""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({name: asdict(r) for name, r in self._records.items()}), encoding='utf-8')
+            os.replace(tmp, self.path)
+            self._mtime = self.path.stat().st_mtime
+            self._dirty = False
+
+
+class RetryBudget:
+    """Retries allowed as a share of requests, so a failing refresh can't multiply its load"""
+
+    def __init__(self, ratio: float = RETRY_RATIO, minimum: int = RETRY_MIN):
+        self.ratio = ratio
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Account for one first-attempt request"""
+        with self._lock:
+            self.tokens += self.ratio
+
+    def withdraw(self) -> bool:
+        """Take one retry; False when the budget is spent"""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
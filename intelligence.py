@@ -0,0 +1,812 @@
+"""
+AMAG Competitor Intelligence Core
+Streamlit-free scraping, caching and snapshot storage
+"""
+
+from datetime import datetime, timedelta
+import json
+import csv
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from pathlib import Path
+
+from archive import PageArchive, content_digest
+from crawl import CRAWL_MAX_OFFERS, DEFAULT_NEXT_SELECTOR, CrawlFrontier, crawl_budget, pair_offers, parse_html
+from health import HealthRegistry, RetryBudget
+from keywords import DEFAULT_KEYWORDS, KeywordHit, get_matcher
+from offers import diff_offers, normalize_offer, offer_key
+from politeness import HOST_CONCURRENCY, Politeness, interleave_by_host
+from rollups import (
+    ROLLUP_VERSION,
+    SCHEMA as ROLLUP_SCHEMA,
+    apply_rollups,
+    query_trend,
+    rollup_rows,
+    top_models,
+)
+from structured import covers_listing, extract_structured_offers
+from telemetry import TELEMETRY, span
+
+logger = logging.getLogger(__name__)
+
+# Dealer registry: one CSV row per competitor (name, urls, selectors, optional parser/keywords)
+DEALERS_PATH = Path(os.environ.get('AMAG_CI_DEALERS', Path(__file__).parent / 'dealers.csv'))
+
+
+def load_competitors(path: Path = DEALERS_PATH) -> Dict[str, Dict]:
+    """Load the dealer registry; empty optional columns are left out of the config"""
+    competitors = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            name = row.pop('name').strip()
+            config = {key: value.strip() for key, value in row.items() if value and value.strip()}
+            if 'keywords' in config:
+                config['keywords'] = [kw.strip() for kw in config['keywords'].split('|') if kw.strip()]
+            competitors[name] = config
+    return competitors
+
+
+# Configuration
+COMPETITORS = load_competitors()
+
+# Fetch engine settings
+FETCH_MAX_WORKERS = 32       # parallel competitor scrapes across all hosts
+FETCH_DEADLINE_SECONDS = 10  # global budget for one refresh
+FETCH_TIMEOUT_SECONDS = 3    # per request until a competitor's latency history adapts it
+FETCH_ATTEMPTS = 2           # first try plus retries, as far as the retry budget allows
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_BACKOFF_SECONDS = 0.5
+POOL_HOSTS = 100             # hosts with keep-alive connections kept open
+
+# HTML parsing: 'lxml' single-pass fast path, 'html.parser' for full soup selectors
+PARSER_MODE = 'lxml'
+PRUNED_TAGS = ('script', 'style', 'noscript', 'svg', 'template', 'iframe')
+# Bumped whenever extraction code changes what a page yields; cached results are then re-extracted
+EXTRACTOR_VERSION = 4
+
+# Local storage for caches and snapshots
+DATA_DIR = Path(os.environ.get('AMAG_CI_DATA_DIR', Path(__file__).parent / 'data'))
+HTTP_CACHE_PATH = DATA_DIR / 'http_cache.json'
+SNAPSHOT_DB_PATH = DATA_DIR / 'snapshots.sqlite3'
+HEALTH_PATH = DATA_DIR / 'health.json'
+# Raw page bodies, kept so extractor fixes can be replayed over history (reextract.py)
+PAGE_ARCHIVE_DIR = DATA_DIR / 'pages'
+# Span metrics written after each refresh; '.json' for JSON, anything else Prometheus text
+METRICS_PATH = Path(os.environ.get('AMAG_CI_METRICS', DATA_DIR / 'metrics.prom'))
+
+# Robust Demo Data
+DEMO_DATA = {
+    'Emil Frey': {
+        'aktionen': [
+            {'title': 'VW Golf 8 - Winteraktion 2025', 'price': 'CHF 29,900', 'discount': '15% Rabatt', 'type': 'Neuwagen'},
+            {'title': 'Audi A3 Sportback - Top-Leasing', 'price': 'CHF 299/Mt', 'discount': '0% Leasing', 'type': 'Leasing'},
+            {'title': 'Service-Paket Winter Komplett', 'price': 'CHF 199', 'discount': '20% Rabatt', 'type': 'Service'},
+            {'title': 'Seat Leon FR - Lagerfahrzeug', 'price': 'CHF 26,500', 'discount': '18% Rabatt', 'type': 'Lagerfahrzeug'}
+        ],
+        'keywords': ['winteraktion', 'leasing', 'service', 'vw', 'audi', 'rabatt', 'seat', 'lagerfahrzeug'],
+        'metrics': {'total_offers': 12, 'avg_discount': 15.5, 'new_this_week': 3},
+        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
+    },
+    'Garage Weiss': {
+        'aktionen': [
+            {'title': 'Mercedes A-Klasse Edition', 'price': 'CHF 35,500', 'discount': '10% Rabatt', 'type': 'Neuwagen'},
+            {'title': 'BMW 3er - Business Paket', 'price': 'CHF 45,900', 'discount': 'Inkl. Extras', 'type': 'Business'},
+            {'title': 'Winterreifen-Aktion 2025', 'price': 'CHF 599', 'discount': '25% Rabatt', 'type': 'Reifen'},
+            {'title': 'Smart EQ - Elektro-Bonus', 'price': 'CHF 19,900', 'discount': 'Ökoprämie', 'type': 'Elektro'}
+        ],
+        'keywords': ['mercedes', 'bmw', 'business', 'winterreifen', 'premium', 'elektro', 'smart'],
+        'metrics': {'total_offers': 8, 'avg_discount': 12.3, 'new_this_week': 2},
+        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
+    },
+    'Auto Kunz': {
+        'aktionen': [
+            {'title': 'Toyota Hybrid-Wochen', 'price': 'CHF 31,900', 'discount': 'Ökobonus CHF 2000', 'type': 'Hybrid'},
+            {'title': 'Mazda CX-5 4x4 Revolution', 'price': 'CHF 39,900', 'discount': '12% Rabatt', 'type': 'SUV'},
+            {'title': 'Gratis-Service 3 Jahre', 'price': 'CHF 0', 'discount': 'Beim Neukauf', 'type': 'Service'},
+            {'title': 'Ford Kuga - Lagerräumung', 'price': 'CHF 28,900', 'discount': '22% Rabatt', 'type': 'Lagerfahrzeug'}
+        ],
+        'keywords': ['hybrid', 'toyota', 'mazda', '4x4', 'ökobonus', 'gratis', 'ford', 'suv'],
+        'metrics': {'total_offers': 10, 'avg_discount': 14.8, 'new_this_week': 4},
+        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
+    },
+    'AMAG': {
+        'aktionen': [
+            {'title': 'VW ID.4 - Elektro-Offensive', 'price': 'CHF 42,900', 'discount': 'Inkl. Wallbox', 'type': 'Elektro'},
+            {'title': 'Audi Q5 - Premium-Leasing', 'price': 'CHF 599/Mt', 'discount': '1.9% Zins', 'type': 'Leasing'},
+            {'title': 'SEAT Ibiza - Young Driver', 'price': 'CHF 18,900', 'discount': '20% Rabatt', 'type': 'Young Driver'},
+            {'title': 'Skoda Octavia Combi', 'price': 'CHF 29,900', 'discount': 'CHF 3000 Prämie', 'type': 'Kombi'}
+        ],
+        'keywords': ['elektro', 'id4', 'premium', 'leasing', 'young', 'skoda', 'vw', 'audi'],
+        'metrics': {'total_offers': 15, 'avg_discount': 16.2, 'new_this_week': 5},
+        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M')
+    }
+}
+
+# Parse demo prices once, like scraped offers at ingest
+for _demo in DEMO_DATA.values():
+    _demo['aktionen'] = [normalize_offer(a) for a in _demo['aktionen']]
+
+
+_SIMPLE_SELECTOR = re.compile(
+    r'^(?P<tag>[a-zA-Z][\w-]*|\*)?'
+    r'(?P<classes>(?:\.[\w-]+)*)'
+    r'(?P<attrs>(?:\[[\w-]+(?:[*^$~]?=(?:"[^"]*"|\'[^\']*\'|[^\]]*))?\])*)$'
+)
+_ATTR_SELECTOR = re.compile(r'\[([\w-]+)(?:([*^$~]?=)(?:"([^"]*)"|\'([^\']*)\'|([^\]]*)))?\]')
+
+
+def compile_simple_selector(selector: str) -> Optional[Callable]:
+    """Compile a combinator-free CSS selector into an lxml element predicate.
+    
+    Returns None for selectors the fast path cannot evaluate (descendant
+    combinators, pseudo-classes, ...), which then use the soup parser.
+    """
+    selector = selector.strip()
+    match = _SIMPLE_SELECTOR.match(selector)
+    if not selector or not match:
+        return None
+    tag = match.group('tag')
+    tag = None if tag in (None, '*') else tag.lower()
+    classes = [c for c in match.group('classes').split('.') if c]
+    attrs = []
+    for attr, op, dq, sq, bare in _ATTR_SELECTOR.findall(match.group('attrs')):
+        attrs.append((attr, op, dq or sq or bare.strip()))
+    
+    def predicate(el) -> bool:
+        if tag and el.tag != tag:
+            return False
+        if classes:
+            el_classes = (el.get('class') or '').split()
+            if any(c not in el_classes for c in classes):
+                return False
+        for attr, op, value in attrs:
+            actual = el.get(attr)
+            if actual is None:
+                return False
+            if op == '=' and actual != value:
+                return False
+            if op == '*=' and value not in actual:
+                return False
+            if op == '^=' and not actual.startswith(value):
+                return False
+            if op == '$=' and not actual.endswith(value):
+                return False
+            if op == '~=' and value not in actual.split():
+                return False
+        return True
+    
+    return predicate
+
+
+def extraction_digest(config: Dict) -> str:
+    """Fingerprint of everything that decides what a page extracts to"""
+    relevant = {key: value for key, value in config.items()
+                if key.startswith('selector_') or key in ('parser', 'keywords')}
+    relevant.setdefault('parser', PARSER_MODE)
+    return content_digest(json.dumps([EXTRACTOR_VERSION, relevant], sort_keys=True).encode('utf-8'))[:16]
+
+
+class HttpCache:
+    """On-disk store of validators (ETag/Last-Modified), body hash and parsed result per URL.
+    
+    Each result carries the extraction digest of the config that produced
+    it, so a selector change never serves a result extracted under old ones.
+    """
+    
+    # Bumped whenever the cached result format changes; older files are discarded
+    VERSION = 4
+    
+    def __init__(self, path: Optional[Path] = HTTP_CACHE_PATH):
+        """``path=None`` keeps entries in memory only; flush() is then a no-op"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            stored = json.loads(path.read_text(encoding='utf-8')) if path is not None else {}
+        except (OSError, ValueError):
+            stored = {}
+        self._entries = stored.get('entries', {}) if stored.get('version') == self.VERSION else {}
+    
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(url)
+    
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str],
+            content_hash: str, result: Dict, extraction: str):
+        with self._lock:
+            self._entries[url] = {'etag': etag, 'last_modified': last_modified,
+                                  'content_hash': content_hash, 'result': result, 'extraction': extraction}
+            self._dirty = True
+    
+    def discard(self, urls: Iterable[str]) -> int:
+        """Drop the entries of ``urls`` so their next fetch is extracted afresh; returns how many were cached"""
+        with self._lock:
+            dropped = sum(self._entries.pop(url, None) is not None for url in urls)
+            self._dirty = self._dirty or bool(dropped)
+            return dropped
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers for a cached URL"""
+        entry = self.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def flush(self):
+        """Persist pending entries atomically"""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'version': self.VERSION, 'entries': self._entries}, ensure_ascii=False),
+                           encoding='utf-8')
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+class SnapshotStore:
+    """SQLite store of timestamped scrape results, one row per competitor and scrape"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            competitor TEXT NOT NULL,
+            scraped_at TEXT NOT NULL,
+            source TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_snapshots_competitor
+            ON snapshots (competitor, scraped_at);
+    """
+    
+    def __init__(self, path: Path = SNAPSHOT_DB_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA + ROLLUP_SCHEMA)
+        self._latest_version = None
+        self._latest = {}
+        self._backfill_rollups()
+    
+    def _backfill_rollups(self):
+        """One-off rollup build for snapshots stored before rollups existed or under older model keys"""
+        with self._lock, self._conn:
+            if self._conn.execute('PRAGMA user_version').fetchone()[0] >= ROLLUP_VERSION:
+                return
+            self._rebuild_rollups()
+            self._conn.execute(f'PRAGMA user_version = {ROLLUP_VERSION}')
+    
+    def _rebuild_rollups(self):
+        """Recompute all rollups from the snapshots; the caller holds the lock and transaction"""
+        self._conn.execute('DELETE FROM rollups')
+        for competitor, scraped_at, payload in self._conn.execute(
+                'SELECT competitor, scraped_at, payload FROM snapshots ORDER BY id'):
+            apply_rollups(self._conn, rollup_rows(competitor, scraped_at, json.loads(payload).get('aktionen', [])))
+    
+    def rewrite(self, updates: Iterable[Tuple[int, Dict]], batch_size: int = 500) -> int:
+        """Replace the results of existing snapshots, then rebuild the rollups.
+        
+        Commits every ``batch_size`` rows so concurrent scrapes are never
+        blocked for long. Ids and timestamps stay, so a running dashboard
+        shows rewritten snapshots after its next refresh or restart.
+        """
+        count = 0
+        batch = []
+        for snapshot_id, result in updates:
+            batch.append((result.get('source', 'live'), json.dumps(result, ensure_ascii=False), snapshot_id))
+            if len(batch) >= batch_size:
+                count += self._update(batch)
+                batch = []
+        count += self._update(batch)
+        with self._lock, self._conn:
+            self._rebuild_rollups()
+            self._latest_version = None
+        return count
+    
+    def _update(self, batch: List[Tuple]) -> int:
+        with self._lock, self._conn:
+            self._conn.executemany('UPDATE snapshots SET source = ?, payload = ? WHERE id = ?', batch)
+        return len(batch)
+    
+    def record(self, competitor: str, result: Dict, scraped_at: Optional[datetime] = None) -> int:
+        """Append a snapshot and fold its offers into the rollups, in one transaction"""
+        scraped_at = (scraped_at or datetime.now()).isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO snapshots (competitor, scraped_at, source, payload) VALUES (?, ?, ?, ?)',
+                (competitor, scraped_at, result.get('source', 'live'),
+                 json.dumps(result, ensure_ascii=False))
+            )
+            apply_rollups(self._conn, rollup_rows(competitor, scraped_at, result.get('aktionen', [])))
+            return cursor.lastrowid
+    
+    def version(self) -> Optional[int]:
+        """Id of the newest snapshot; changes whenever anything was recorded"""
+        with self._lock:
+            return self._conn.execute('SELECT MAX(id) FROM snapshots').fetchone()[0]
+    
+    def trend(self, metric: str, since: Optional[datetime] = None, competitors: Optional[List[str]] = None,
+              model: Optional[str] = None, monthly: bool = False) -> List[Dict]:
+        """Downsampled average 'price' or 'discount' per competitor and period from the rollups"""
+        with self._lock:
+            return query_trend(self._conn, metric, since, competitors=competitors, model=model, monthly=monthly)
+    
+    def models(self, competitors: Optional[List[str]] = None, monthly: bool = False) -> List[str]:
+        """Most frequently priced models, for trend selection"""
+        with self._lock:
+            return top_models(self._conn, competitors, monthly)
+    
+    def latest(self) -> Dict[str, Dict]:
+        """Newest snapshot per competitor, re-read only when new rows arrived"""
+        with self._lock:
+            version = self._conn.execute('SELECT MAX(id) FROM snapshots').fetchone()[0]
+            if version != self._latest_version:
+                rows = self._conn.execute("""
+                    SELECT s.id, s.competitor, s.scraped_at, s.payload FROM snapshots s
+                    JOIN (SELECT competitor, MAX(id) AS id FROM snapshots GROUP BY competitor) m
+                      ON s.id = m.id
+                """).fetchall()
+                self._latest = {comp: {**self._decode(payload), 'scraped_at': scraped_at, 'snapshot_id': row_id}
+                                for row_id, comp, scraped_at, payload in rows}
+                self._latest_version = version
+            return dict(self._latest)
+    
+    def history(self, competitor: Optional[str] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> List[Dict]:
+        """All snapshots in a time range, oldest first"""
+        return list(self.iter_snapshots([competitor] if competitor else None, since, until))
+    
+    def iter_snapshots(self, competitors: Optional[List[str]] = None, since: Optional[datetime] = None,
+                       until: Optional[datetime] = None, batch_size: int = 500,
+                       with_ids: bool = False) -> Iterator[Dict]:
+        """Stream snapshots oldest first, holding at most ``batch_size`` rows in memory.
+        
+        Uses its own read connection so long exports don't block scrapes.
+        ``with_ids`` adds each row's ``snapshot_id``, as ``latest`` does.
+        """
+        query = 'SELECT id, competitor, scraped_at, payload FROM snapshots WHERE 1=1'
+        params = []
+        if competitors:
+            query += f" AND competitor IN ({', '.join('?' * len(competitors))})"
+            params.extend(competitors)
+        if since:
+            query += ' AND scraped_at >= ?'
+            params.append(since.isoformat(timespec='seconds'))
+        if until:
+            query += ' AND scraped_at < ?'
+            params.append(until.isoformat(timespec='seconds'))
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(query + ' ORDER BY scraped_at, id', params)
+            while rows := cursor.fetchmany(batch_size):
+                for row_id, comp, scraped_at, payload in rows:
+                    snapshot = {**self._decode(payload), 'competitor': comp, 'scraped_at': scraped_at}
+                    if with_ids:
+                        snapshot['snapshot_id'] = row_id
+                    yield snapshot
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _decode(payload: str) -> Dict:
+        """Load a stored result, typing offers recorded before prices were parsed at ingest"""
+        result = json.loads(payload)
+        result['aktionen'] = [normalize_offer(a) for a in result.get('aktionen', [])]
+        return result
+
+
+class CompetitorIntelligence:
+    """Main scraping and analysis class"""
+    
+    def __init__(self, http_cache: Optional[HttpCache] = None, health: Optional[HealthRegistry] = None,
+                 archive: Optional[PageArchive] = None):
+        # The HTTP stack loads with the first scraper, not with the dashboard
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        # Keep-alive connection pool shared by all fetch workers
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=HOST_CONCURRENCY)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.http_cache = http_cache if http_cache is not None else HttpCache()
+        # Circuit breakers and latency history per competitor
+        self.health = health if health is not None else HealthRegistry(HEALTH_PATH)
+        self.retry_budget = RetryBudget()
+        # Per-host rate limits, concurrency caps and robots.txt rules
+        self.politeness = Politeness(self._fetch_robots, self.headers['User-Agent'])
+        # Every fetched body, for offline re-extraction
+        self.archive = archive if archive is not None else PageArchive(PAGE_ARCHIVE_DIR)
+    
+    @classmethod
+    def offline(cls) -> 'CompetitorIntelligence':
+        """Extractor for archived pages that never reads or writes the fetch state files"""
+        return cls(http_cache=HttpCache(None), health=HealthRegistry(None))
+    
+    def _fetch_robots(self, url: str) -> Optional[str]:
+        """robots.txt body, None if the host has none or can't be reached"""
+        import requests
+        
+        try:
+            response = self.session.get(url, timeout=FETCH_TIMEOUT_SECONDS, verify=False)
+        except requests.RequestException:
+            return None
+        return response.text if response.status_code == 200 else None
+        
+    def scrape_competitor(self, name: str, config: Dict, stop_at: Optional[float] = None) -> Dict:
+        """Crawl a competitor's offer pages, fallback to demo data.
+        
+        Pagination and offer links within the dealer's site are followed up to
+        the configured depth and page budgets. No new page is started after
+        ``stop_at`` (time.monotonic), so a slow site still yields what it has.
+        Competitors whose circuit breaker is open are skipped without a request.
+        """
+        with span('scrape', competitor=name) as scrape:
+            if not self.health.allow(name):
+                scrape['error'] = 'CircuitOpen'
+                return self._fallback(name, 'CircuitOpen')
+            try:
+                pages, error = self._crawl(name, config, stop_at)
+                if pages:
+                    result = self._assemble(pages)
+                    if result['aktionen']:  # Found real data
+                        self.health.record(name)
+                        # Archived bodies the result was built from, in crawl order
+                        result['pages'] = [[page['url'], page['content_hash']] for page in pages]
+                        return result
+                    error = 'NoOffersFound'
+            except Exception as exc:
+                error = type(exc).__name__
+                logger.warning('%s: scrape failed (%s: %s), using demo data', name, error, exc)
+            scrape['error'] = error
+            self.health.record(name, error)
+        
+        # Return demo data as fallback
+        return self._fallback(name, error)
+    
+    def _fallback(self, name: str, error: str) -> Dict:
+        """Demo data marked with why the live scrape failed"""
+        return {**DEMO_DATA.get(name, {}), 'source': 'demo', 'error': error}
+    
+    def _crawl(self, name: str, config: Dict, stop_at: Optional[float]) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch pages from a bounded frontier; returns page records and the last page error"""
+        frontier = CrawlFrontier(config['aktionen_url'], *crawl_budget(config))
+        pages = []
+        error = None
+        for url, depth in frontier:
+            if pages and stop_at is not None and time.monotonic() >= stop_at:
+                break
+            try:
+                page, content_hash, error = self._fetch_page(name, config, url)
+            except Exception as exc:
+                error = type(exc).__name__
+                logger.warning('%s: fetching %s failed (%s: %s)', name, url, error, exc)
+                continue
+            if page is not None:
+                pages.append({**page, 'url': url, 'content_hash': content_hash})
+                frontier.add_links(url, page['next'], page['detail'], depth)
+        return pages, error
+    
+    def _fetch_page(self, name: str, config: Dict, url: str) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """Fetch, archive and extract one page, revalidating cached pages; returns (page, body hash, error)
+        
+        Cached results are only reused when extracted under the current
+        config; otherwise an unchanged page is re-extracted from its archived
+        body, or fetched in full if that body is not archived.
+        """
+        if not self.politeness.allowed(url):
+            raise PermissionError(f"robots.txt disallows {url}")
+        extraction = extraction_digest(config)
+        cached = self.http_cache.get(url)
+        reusable = cached is not None and cached.get('extraction') == extraction
+        revalidate = cached is not None and (reusable or cached['content_hash'] in self.archive)
+        response = self._get(name, url, revalidate)
+        
+        if response.status_code == 304 and revalidate:
+            if reusable:
+                return cached['result'], cached['content_hash'], None
+            content_hash = cached['content_hash']
+            content = self.archive.get(content_hash)
+            if content is None:  # Archived body vanished since the check above
+                return self._fetch_page(name, config, url)
+            etag, last_modified = cached['etag'], cached['last_modified']
+        else:
+            if response.status_code != 200:
+                return None, None, f"HTTP{response.status_code}"
+            content = response.content
+            content_hash = content_digest(content)
+            with span('archive'):
+                self.archive.put(content, content_hash)
+            # Servers without validators still skip parsing when the body is unchanged
+            if reusable and cached['content_hash'] == content_hash:
+                return cached['result'], content_hash, None
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        with span('parse'):
+            page = self._extract_page(config, content)
+        self.http_cache.put(url, etag, last_modified, content_hash, page, extraction)
+        return page, content_hash, None
+    
+    def _get(self, name: str, url: str, revalidate: bool = True):
+        """Conditional GET with an adaptive timeout; transient failures retry within the budget"""
+        import requests
+        
+        timeout = self.health.timeout(name, FETCH_TIMEOUT_SECONDS)
+        self.retry_budget.deposit()
+        for attempt in range(1, FETCH_ATTEMPTS + 1):
+            retryable = attempt < FETCH_ATTEMPTS
+            try:
+                with self.politeness.slot(url), span('fetch') as fetch:
+                    response = self.session.get(
+                        url, 
+                        headers=self.http_cache.conditional_headers(url) if revalidate else {}, 
+                        timeout=timeout,
+                        verify=False  # In case of SSL issues
+                    )
+                    fetch.update(status=response.status_code, bytes=len(response.content), attempt=attempt)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not (retryable and self.retry_budget.withdraw()):
+                    raise
+                logger.info('%s: retrying %s after %s', name, url, type(exc).__name__)
+            else:
+                self.health.observe_latency(name, response.elapsed.total_seconds())
+                if not (response.status_code in RETRY_STATUSES and retryable and self.retry_budget.withdraw()):
+                    return response
+                logger.info('%s: retrying %s after HTTP %d', name, url, response.status_code)
+            time.sleep(RETRY_BACKOFF_SECONDS * attempt * random.uniform(0.5, 1.5))
+    
+    def _extract_page(self, config: Dict, content: bytes) -> Dict:
+        """Offers, outgoing links and keyword counts of one page.
+        
+        schema.org offers (JSON-LD, microdata) come first. When they cover the
+        listing, the title and price selectors are skipped; a lone featured
+        product is merged with the selector offers instead.
+        """
+        with span('structured'):
+            structured = extract_structured_offers(content)
+            listing = covers_listing(content, structured)
+        extracted = None
+        if config.get('parser', PARSER_MODE) == 'lxml':
+            with span('selectors', parser='lxml'):
+                extracted = self._extract_lxml(config, content, offers=not listing)
+        if extracted is None:
+            with span('selectors', parser='soup'):
+                extracted = self._extract_soup(config, content, offers=not listing)
+        offers, next_links, detail_links, text = extracted
+        # Structured offers first, so they win _assemble's offer_key deduplication
+        offers = structured + list(offers)
+        
+        with span('keywords'):
+            keyword_hits = self._match_keywords(text, config.get('keywords', ()))
+        return {'offers': offers, 'next': next_links, 'detail': detail_links,
+                'keyword_hits': {term: hit.count for term, hit in keyword_hits.items()}}
+    
+    def _assemble(self, pages: List[Dict]) -> Dict:
+        """Competitor result from crawled pages; offers deduplicated by title"""
+        aktionen = []
+        seen = set()
+        keyword_hits = Counter()
+        for page in pages:
+            keyword_hits.update(page['keyword_hits'])
+            # [title, price] from selectors, [title, price, category] from structured data
+            for title, price, *category in page['offers']:
+                key = offer_key({'title': title})
+                if key in seen or len(aktionen) >= CRAWL_MAX_OFFERS:
+                    continue
+                seen.add(key)
+                aktionen.append(normalize_offer({
+                    'title': title,
+                    'price': price or 'Auf Anfrage',
+                    'discount': self._extract_discount(title),
+                    'type': (category and category[0]) or 'Live-Daten'
+                }))
+        discounts = [a['discount_pct'] for a in aktionen if a['discount_pct'] is not None]
+        
+        return {
+            'aktionen': aktionen,
+            'keywords': self._extract_keywords(keyword_hits),
+            'keyword_hits': dict(keyword_hits),
+            'metrics': {'total_offers': len(aktionen),
+                        'avg_discount': sum(discounts) / len(discounts) if discounts else 0,
+                        'new_this_week': 1},
+            'last_update': datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'source': 'live'
+        }
+    
+    def _parse_page(self, config: Dict, content: bytes) -> Optional[Dict]:
+        """Extract offers and keywords from a single fetched page"""
+        result = self._assemble([self._extract_page(config, content)])
+        return result if result['aktionen'] else None
+    
+    def _extract_soup(self, config: Dict, content: bytes,
+                      offers: bool = True) -> Tuple[List[Tuple[str, Optional[str]]], List[str], List[str], str]:
+        """Reference extraction over a full BeautifulSoup tree; ``offers=False`` only collects links and text"""
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        def select(selectors: str) -> List:
+            return [el for selector in selectors.split(', ') if selector.strip() for el in soup.select(selector)]
+        
+        def hrefs(selectors: str) -> List[str]:
+            return [el['href'] for el in select(selectors) if el.get('href')]
+        
+        # Extract titles and prices paired per offer card
+        pairs = []
+        if offers:
+            pairs = pair_offers(select(config['selector_title']), select(config['selector_price']),
+                                select(config.get('selector_card', '')),
+                                lambda el: el.parent, lambda el: el.text.strip())
+        
+        return (pairs, hrefs(config.get('selector_next', DEFAULT_NEXT_SELECTOR)),
+                hrefs(config.get('selector_detail', '')), soup.get_text())
+    
+    def _extract_lxml(self, config: Dict, content: bytes,
+                      offers: bool = True) -> Optional[Tuple[List[Tuple[str, Optional[str]]], List[str], List[str], str]]:
+        """Single-pass extraction over a pruned lxml tree.
+        
+        Title, price, card and link selectors are all matched in one
+        traversal, which also collects the page text for keyword extraction.
+        ``offers=False`` skips the title, price and card selectors. Returns
+        None when a selector is too complex for the fast path.
+        """
+        from lxml import etree
+        
+        groups = {'title': config['selector_title'] if offers else '',
+                  'price': config['selector_price'] if offers else '',
+                  'card': config.get('selector_card', '') if offers else '',
+                  'next': config.get('selector_next', DEFAULT_NEXT_SELECTOR),
+                  'detail': config.get('selector_detail', '')}
+        matchers = []
+        for group, selectors in groups.items():
+            for selector in selectors.split(', '):
+                if selector.strip():
+                    matches = compile_simple_selector(selector)
+                    if matches is None:
+                        return None
+                    matchers.append((group, matches))
+        
+        try:
+            root = parse_html(content)
+        except (etree.ParserError, ValueError):
+            return [], [], [], ''
+        # Drop subtrees that never hold offers (keeps their tail text)
+        etree.strip_elements(root, *PRUNED_TAGS, with_tail=False)
+        
+        found = {group: [] for group in groups}
+        text_parts = []
+        # Depth-first over an explicit stack; a tail follows its element's subtree, as in itertext()
+        stack = [(root, False)]
+        while stack:
+            el, closed = stack.pop()
+            if closed:
+                if el.tail:
+                    text_parts.append(el.tail)
+                continue
+            stack.append((el, True))
+            if not isinstance(el.tag, str):  # Comments and processing instructions
+                continue
+            if el.text:
+                text_parts.append(el.text)
+            for group, matches in matchers:
+                if matches(el):
+                    found[group].append(el)
+            stack.extend((child, False) for child in reversed(el))
+        
+        pairs = pair_offers(found['title'], found['price'], found['card'],
+                            lambda el: el.getparent(), lambda el: el.text_content().strip())
+        links = {group: [el.get('href') for el in found[group] if el.get('href')] for group in ('next', 'detail')}
+        return pairs, links['next'], links['detail'], ' '.join(text_parts)
+    
+    def scrape_all(self, competitors: Dict[str, Dict], max_workers: int = FETCH_MAX_WORKERS,
+                   deadline: float = FETCH_DEADLINE_SECONDS) -> Iterator[Tuple[str, Dict]]:
+        """Scrape all competitors in parallel, yielding (name, result) as each finishes.
+        
+        Competitors still running when the global deadline expires are yielded
+        with demo data so a refresh never takes longer than ``deadline``.
+        """
+        self.retry_budget = RetryBudget()
+        # Crawls stop starting new pages early enough for the last fetch to finish
+        stop_at = time.monotonic() + max(deadline - FETCH_TIMEOUT_SECONDS, deadline / 2)
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(competitors) or 1)))
+        futures = {executor.submit(self.scrape_competitor, name, config, stop_at): name
+                   for name, config in interleave_by_host(list(competitors.items()))}
+        pending = set(futures.values())
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                name = futures[future]
+                pending.discard(name)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    logger.exception('%s: scrape worker crashed', name)
+                    result = self._fallback(name, type(exc).__name__)
+                yield name, result
+        except FuturesTimeout:
+            for name in competitors:
+                if name in pending:
+                    logger.warning('%s: no result within the %.0fs refresh deadline', name, deadline)
+                    yield name, self._fallback(name, 'DeadlineExceeded')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.http_cache.flush()
+            self.health.flush()
+    
+    def _extract_discount(self, text: str) -> str:
+        """Extract discount information"""
+        text = text.lower()
+        if match := re.search(r'(\d+)\s*%', text):
+            return f"{match.group(1)}% Rabatt"
+        return "Sonderangebot"
+    
+    def _match_keywords(self, text: str, extra_terms=()) -> Dict[str, KeywordHit]:
+        """Find default and competitor-specific terms in one scan of the page text"""
+        return get_matcher(tuple(DEFAULT_KEYWORDS) + tuple(extra_terms)).find(text)
+    
+    def _extract_keywords(self, counts: Dict[str, int]) -> List[str]:
+        """Extract relevant keywords, most frequent first"""
+        return sorted(counts, key=counts.get, reverse=True)[:10]
+
+
+def track_changes(result: Dict, previous: Optional[Dict], now: Optional[datetime] = None) -> Dict:
+    """Diff a fresh result against the previous snapshot.
+    
+    Offers carry their first_seen timestamp forward, so new_this_week counts
+    offers that really appeared during the last seven days.
+    """
+    now = now or datetime.now()
+    previous_offers = (previous or {}).get('aktionen', [])
+    first_seen = {offer_key(a): a.get('first_seen') for a in previous_offers}
+    stamp = now.isoformat(timespec='seconds')
+    aktionen = [{**a, 'first_seen': first_seen.get(offer_key(a)) or stamp} for a in result.get('aktionen', [])]
+    
+    week_ago = (now - timedelta(days=7)).isoformat(timespec='seconds')
+    return {
+        **result,
+        'aktionen': aktionen,
+        'changes': diff_offers(previous_offers, aktionen) if previous else None,
+        'metrics': {**result.get('metrics', {}),
+                    'new_this_week': sum(1 for a in aktionen if a['first_seen'] >= week_ago)},
+    }
+
+
+def mark_stale(snapshot: Dict, error: Optional[str]) -> Dict:
+    """Last good snapshot served in place of a failed scrape"""
+    return {**snapshot, 'source': 'stale', 'error': error}
+
+
+def run_refresh(scraper: CompetitorIntelligence, store: SnapshotStore,
+                competitors: Dict[str, Dict] = COMPETITORS, **fetch_options) -> Iterator[Tuple[str, Dict]]:
+    """Scrape all competitors and record live results, yielding each as it finishes.
+    
+    A failed scrape yields the competitor's last good snapshot, marked 'stale'
+    with the error, and only falls back to demo data when there is none.
+    """
+    previous = store.latest()
+    try:
+        for name, result in scraper.scrape_all(competitors, **fetch_options):
+            if result.get('source') == 'live':
+                result = track_changes(result, previous.get(name))
+                store.record(name, result)
+            elif name in previous:
+                result = mark_stale(previous[name], result.get('error'))
+            yield name, result
+    finally:
+        TELEMETRY.write(METRICS_PATH)
@@ -0,0 +1,139 @@
+"""
+AMAG Competitor Intelligence Keywords
+Aho-Corasick multi-term matcher with umlaut-aware normalization
+"""
+
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Default vocabulary; a trailing '*' also matches longer words ('aktion*' -> 'Aktionen')
+DEFAULT_KEYWORDS = ('leasing*', 'rabatt*', 'gratis', 'aktion*', 'hybrid*', 'elektro*', 'service*')
+
+_TOKEN = re.compile(r'\w+')
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+def normalize(text: str) -> str:
+    """Lowercase, spell out German umlauts and strip remaining diacritics"""
+    text = text.lower().translate(_UMLAUTS)
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+@dataclass
+class KeywordHit:
+    """Occurrences of one vocabulary term, positions are offsets into the original text"""
+    term: str
+    count: int = 0
+    positions: List[int] = field(default_factory=list)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over word tokens.
+
+    Terms and text are split into normalized word tokens, so every match is
+    word-bounded and punctuation-insensitive ('CX-5' matches 'cx 5'). The
+    page is scanned once regardless of vocabulary size.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._lengths: List[int] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+        self._prefix: List[Dict[str, List[int]]] = [{}]
+        for term in dict.fromkeys(terms):
+            self._add(term)
+        self._fail = self._build_fail_links()
+        self._prefix_lengths = [sorted({len(p) for p in edges}) for edges in self._prefix]
+        self._max_len = max(self._lengths, default=1)
+
+    def _add(self, term: str):
+        is_prefix = term.endswith('*')
+        tokens = [normalize(t) for t in _TOKEN.findall(term.rstrip('*'))]
+        if not tokens:
+            return
+        term_id = len(self.terms)
+        self.terms.append(term.rstrip('*').lower())
+        self._lengths.append(len(tokens))
+
+        state = 0
+        for token in tokens[:-1] if is_prefix else tokens:
+            if token not in self._goto[state]:
+                self._goto.append({})
+                self._out.append([])
+                self._prefix.append({})
+                self._goto[state][token] = len(self._goto) - 1
+            state = self._goto[state][token]
+        if is_prefix:
+            self._prefix[state].setdefault(tokens[-1], []).append(term_id)
+        else:
+            self._out[state].append(term_id)
+
+    def _build_fail_links(self) -> List[int]:
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[fail[child]]
+        return fail
+
+    def find(self, text: str) -> Dict[str, KeywordHit]:
+        """All vocabulary terms found in ``text``, keyed by term"""
+        hits: Dict[str, KeywordHit] = {}
+        goto, fail, out, prefix = self._goto, self._fail, self._out, self._prefix
+        starts = deque(maxlen=self._max_len)
+        norm_cache: Dict[str, str] = {}
+        state = 0
+
+        def record(term_id: int):
+            term = self.terms[term_id]
+            hit = hits.get(term)
+            if hit is None:
+                hit = hits[term] = KeywordHit(term)
+            hit.count += 1
+            hit.positions.append(starts[-self._lengths[term_id]])
+
+        for match in _TOKEN.finditer(text):
+            raw = match.group()
+            token = norm_cache.get(raw)
+            if token is None:
+                token = norm_cache[raw] = normalize(raw)
+            starts.append(match.start())
+
+            # Prefix terms end on this token without advancing the automaton
+            s = state
+            while True:
+                if prefix[s]:
+                    for n in self._prefix_lengths[s]:
+                        for term_id in prefix[s].get(token[:n], ()):
+                            record(term_id)
+                if not s:
+                    break
+                s = fail[s]
+
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for term_id in out[state]:
+                record(term_id)
+
+        return hits
+
+
+@lru_cache(maxsize=64)
+def get_matcher(terms: Tuple[str, ...]) -> KeywordMatcher:
+    """Compiled matcher per vocabulary, shared across scrapes"""
+    return KeywordMatcher(terms)
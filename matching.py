@@ -0,0 +1,132 @@
+"""
+AMAG Competitor Intelligence Matching
+Make and model from offer titles, for like-for-like price comparison across competitors
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from offers import offer_model
+
+# Spellings in titles -> displayed make (keys are normalized tokens, see _tokens)
+MAKES = {
+    'vw': 'VW', 'volkswagen': 'VW', 'audi': 'Audi', 'seat': 'SEAT', 'cupra': 'Cupra', 'skoda': 'Škoda',
+    'porsche': 'Porsche', 'mercedes': 'Mercedes-Benz', 'mercedesbenz': 'Mercedes-Benz', 'smart': 'smart',
+    'bmw': 'BMW', 'mini': 'MINI', 'toyota': 'Toyota', 'lexus': 'Lexus', 'mazda': 'Mazda', 'honda': 'Honda',
+    'nissan': 'Nissan', 'subaru': 'Subaru', 'suzuki': 'Suzuki', 'mitsubishi': 'Mitsubishi',
+    'hyundai': 'Hyundai', 'kia': 'Kia', 'ford': 'Ford', 'opel': 'Opel', 'renault': 'Renault',
+    'dacia': 'Dacia', 'peugeot': 'Peugeot', 'citroen': 'Citroën', 'fiat': 'Fiat', 'jeep': 'Jeep',
+    'volvo': 'Volvo', 'polestar': 'Polestar', 'tesla': 'Tesla', 'byd': 'BYD', 'mg': 'MG',
+}
+# Model names (normalized tokens) distinctive enough to imply the make of a title naming none,
+# e.g. 'Golf 8 Life'. A fixed table, so a title resolves the same whatever it is matched with.
+MODELS = {model: make for make, models in {
+    'VW': 'golf polo tiguan touareg passat arteon troc taigo tcross touran sharan caddy multivan amarok '
+          'id3 id4 id5 id7 idbuzz',
+    'Audi': 'a1 a3 a4 a5 a6 a7 a8 q2 q3 q4 q5 q6 q7 q8 etron tt r8',
+    'Škoda': 'fabia scala octavia superb kamiq karoq kodiaq enyaq elroq',
+    'SEAT': 'ibiza leon arona ateca tarraco',
+    'Cupra': 'formentor tavascan terramar',
+    'Porsche': 'taycan macan cayenne panamera',
+    'Mercedes-Benz': 'cla cls gla glb glc gle gls eqa eqb eqe eqs sprinter vito',
+    'BMW': 'x1 x2 x3 x4 x5 x6 x7 z4 ix ix1 ix2 ix3 i4 i5 i7',
+    'MINI': 'cooper countryman clubman',
+    'Toyota': 'yaris aygo corolla chr rav4 bz4x prius supra hilux',
+    'Mazda': 'cx30 cx5 cx60 cx80 mx5',
+    'Honda': 'civic jazz hrv zrv crv',
+    'Nissan': 'micra juke qashqai xtrail ariya',
+    'Subaru': 'impreza forester outback solterra',
+    'Suzuki': 'swift ignis vitara jimny sx4',
+    'Mitsubishi': 'outlander asx',
+    'Hyundai': 'i10 i20 i30 bayon kona tucson ioniq ioniq5 ioniq6',
+    'Kia': 'picanto ceed xceed stonic niro sportage sorento ev3 ev6 ev9',
+    'Ford': 'fiesta focus puma kuga mustang explorer ranger transit',
+    'Opel': 'corsa astra mokka crossland grandland frontera',
+    'Renault': 'clio captur megane austral arkana scenic twingo zoe espace',
+    'Dacia': 'sandero duster jogger',
+    'Citroën': 'c3 c4 c5 berlingo',
+    'Jeep': 'avenger renegade compass wrangler',
+    'Volvo': 'ex30 ex90 xc40 xc60 xc90 v60 v90',
+}.items() for model in models.split()}
+# Words between make and model that name neither
+FILLER = {'neu', 'neue', 'neuer', 'new', 'der', 'die', 'das', 'the', 'all', 'series', 'serie', 'modell', 'benz'}
+
+_TOKEN = re.compile(r'[A-Za-z0-9]+(?:[.\-][A-Za-z0-9]+)*')
+_JOINERS = re.compile(r'[.\-]')
+# 'A-Klasse' / 'A-Class' -> 'a', '3er' -> '3', so spelling variants share a model
+_MODEL_SUFFIX = re.compile(r'^(.+?)(?:klasse|class)$|^(\d)er$')
+
+
+def _tokens(text: str) -> List[Tuple[str, str]]:
+    """(normalized, as written) word pairs; normalized is lower case without inner dots or hyphens"""
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return [(_JOINERS.sub('', m.group().lower()), m.group()) for m in _TOKEN.finditer(folded)]
+
+
+def _model_token(token: str) -> str:
+    match = _MODEL_SUFFIX.match(token)
+    return (match.group(1) or match.group(2)) if match else token
+
+
+def parse_model(title: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(make, model token, model as written) from the model part of a title.
+
+    The model is the first word after the make, so 'VW Golf 8 GTI' and
+    'Volkswagen Golf Variant' both give ('VW', 'golf', 'Golf'). Without a
+    make, the first word is the model and its make comes from MODELS, so
+    'Golf 8 Life' gives ('VW', 'golf', 'Golf') and unknown words (None, ...).
+    """
+    words = _tokens(offer_model(title))
+    for i, (token, _) in enumerate(words):
+        make = MAKES.get(token)
+        if make is not None:
+            rest = [(t, w) for t, w in words[i + 1:] if t not in FILLER and t not in MAKES]
+            return (make, _model_token(rest[0][0]), rest[0][1]) if rest else (make, None, None)
+    if words:
+        token = _model_token(words[0][0])
+        return MODELS.get(token), token, words[0][1]
+    return None, None, None
+
+
+def model_label(make: str, token: str) -> str:
+    """Displayed model of a (make, model token) pair: ('VW', 'golf') -> 'VW Golf', ('VW', 'id4') -> 'VW ID4'"""
+    return f"{make} {token.capitalize() if token.isalpha() and len(token) > 2 else token.upper()}"
+
+
+def match_models(titles: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Model label ('VW Golf') per distinct title; None for offers naming no vehicle.
+
+    Each title is labelled on its own (make-less titles via MODELS), so the
+    price comparison over all competitors and the rollups of one snapshot
+    give a title the same label, the key the trends are stored under.
+    """
+    labels = {}
+    for title in dict.fromkeys(titles):
+        make, token, _ = parse_model(title)
+        labels[title] = model_label(make, token) if make and token else None
+    return labels
+
+
+def model_price_comparison(offers: pd.DataFrame, min_competitors: int = 2) -> pd.DataFrame:
+    """Cheapest price per model and competitor, for models several competitors offer.
+
+    Purchase prices and monthly rates are compared separately. Rows are
+    ordered by the number of competitors offering the model, then by offers.
+    """
+    columns = ['model', 'monthly', 'competitor', 'amount', 'offers', 'competitors']
+    priced = offers.dropna(subset=['amount'])
+    if priced.empty:
+        return pd.DataFrame(columns=columns)
+    labels = match_models(priced['title'].tolist())
+    priced = priced.assign(model=priced['title'].map(labels)).dropna(subset=['model'])
+    grouped = (priced.groupby(['model', 'monthly', 'competitor'], sort=False)['amount']
+               .agg(amount='min', offers='size').reset_index())
+    grouped['competitors'] = grouped.groupby(['model', 'monthly'])['competitor'].transform('nunique')
+    grouped = grouped[grouped['competitors'] >= min_competitors]
+    grouped = grouped.assign(total=grouped.groupby(['model', 'monthly'])['offers'].transform('sum'))
+    grouped = grouped.sort_values(['monthly', 'competitors', 'total', 'model', 'amount'],
+                                  ascending=[True, False, False, True, True])
+    return grouped[columns].reset_index(drop=True)
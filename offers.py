@@ -0,0 +1,178 @@
+"""
+AMAG Competitor Intelligence Offers
+Typed offer fields parsed once at ingest and the columnar offer table
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns of the offer table and their dtypes
+OFFER_COLUMNS = {
+    'competitor': 'string',
+    'title': 'string',
+    'price': 'string',
+    'amount': 'float64',
+    'currency': 'string',
+    'monthly': 'bool',
+    'discount': 'string',
+    'discount_pct': 'float64',
+    'category': 'string',
+    'source': 'string',
+}
+
+_AMOUNT = re.compile(r"(?P<int>\d{1,3}(?:[',’ .]\d{3})+|\d+)(?:[.,](?P<dec>\d{1,2})(?!\d))?")
+_SEPARATORS = re.compile(r"[',’ .]")
+_CURRENCY = re.compile(r'\b(CHF|SFr|Fr|EUR)\b|€', re.IGNORECASE)
+_MONTHLY = re.compile(r'/\s*(mt|mtl|mon|monat|mo)\b|\bpro\s+monat\b|\bmtl\.|\bmonatlich', re.IGNORECASE)
+_PERCENT = re.compile(r'(\d+(?:[.,]\d+)?)\s*%(?!\s*(?:zins|leasing|finanz|eff))', re.IGNORECASE)
+
+
+def parse_price(text: str) -> Tuple[Optional[float], str, bool]:
+    """Parse 'CHF 29,900' / "CHF 299/Mt" into (amount, currency, monthly)"""
+    text = text or ''
+    match = _AMOUNT.search(text)
+    if not match:
+        return None, 'CHF', False
+    amount = float(_SEPARATORS.sub('', match.group('int')))
+    if match.group('dec'):
+        amount += float(f"0.{match.group('dec')}")
+    currency = _CURRENCY.search(text)
+    currency = 'EUR' if currency and currency.group(0).upper() in ('EUR', '€') else 'CHF'
+    return amount, currency, bool(_MONTHLY.search(text))
+
+
+def parse_discount(text: str) -> Optional[float]:
+    """Discount percent from '15% Rabatt'; financing rates like '1.9% Zins' are not discounts"""
+    match = _PERCENT.search(text or '')
+    return float(match.group(1).replace(',', '.')) if match else None
+
+
+def normalize_offer(aktion: Dict) -> Dict:
+    """Add typed price and discount fields to a raw offer dict (idempotent)"""
+    if 'amount' in aktion:
+        return aktion
+    amount, currency, monthly = parse_price(aktion.get('price', ''))
+    return {
+        **aktion,
+        'amount': amount,
+        'currency': currency,
+        'monthly': monthly,
+        'discount_pct': parse_discount(aktion.get('discount', '')),
+    }
+
+
+_MODEL_SPLIT = re.compile(r'\s+[-–—|:/]\s+|\s*\|\s*')
+
+
+def offer_model(title: str) -> str:
+    """Model part of an offer title: 'VW Golf 8 - Winteraktion 2025' -> 'VW Golf 8'"""
+    head = _MODEL_SPLIT.split(title or '', maxsplit=1)[0]
+    return ' '.join(head.split())[:60]
+
+
+def offer_key(aktion: Dict) -> str:
+    """Identity of an offer across scrapes, by its whitespace/case-normalized title"""
+    title = ' '.join((aktion.get('title') or '').lower().split())
+    return hashlib.sha1(title.encode('utf-8')).hexdigest()[:16]
+
+
+def offer_hash(aktion: Dict) -> str:
+    """Fingerprint of the fields whose change makes an offer 'changed'"""
+    fields = '\x1f'.join(str(aktion.get(k, '')) for k in ('title', 'price', 'discount', 'type'))
+    return hashlib.sha1(fields.encode('utf-8')).hexdigest()[:16]
+
+
+def diff_offers(previous: List[Dict], current: List[Dict]) -> Dict[str, List[str]]:
+    """Titles of new, changed and removed offers between two scrapes"""
+    before = {offer_key(a): a for a in previous}
+    after = {offer_key(a): a for a in current}
+    return {
+        'new': [a.get('title', '') for k, a in after.items() if k not in before],
+        'changed': [a.get('title', '') for k, a in after.items()
+                    if k in before and offer_hash(before[k]) != offer_hash(a)],
+        'removed': [a.get('title', '') for k, a in before.items() if k not in after],
+    }
+
+
+def offers_frame(data: Dict[str, Dict]) -> pd.DataFrame:
+    """Flatten competitor results into one typed offer table"""
+    rows = []
+    for competitor, comp_data in data.items():
+        for aktion in comp_data.get('aktionen', []):
+            aktion = normalize_offer(aktion)
+            rows.append({
+                'competitor': competitor,
+                'title': aktion.get('title', 'N/A'),
+                'price': aktion.get('price', 'N/A'),
+                'amount': aktion['amount'],
+                'currency': aktion['currency'],
+                'monthly': aktion['monthly'],
+                'discount': aktion.get('discount', 'N/A'),
+                'discount_pct': aktion['discount_pct'],
+                'category': aktion.get('type', 'N/A'),
+                'source': comp_data.get('source', 'demo'),
+            })
+    return pd.DataFrame(rows, columns=list(OFFER_COLUMNS)).astype(OFFER_COLUMNS)
+
+
+# Rows per page in paginated offer views
+PAGE_SIZE = 50
+
+
+class OfferIndex:
+    """Offer table with presorted row orders for filtered, paginated queries.
+    
+    Built once per displayed data set; each query is a few vectorized masks
+    over the table plus a slice, so only one page of rows leaves the server.
+    """
+    
+    SORT_KEYS = ('amount', 'discount_pct', 'competitor', 'title', 'category')
+    
+    def __init__(self, offers: pd.DataFrame):
+        self.frame = offers.reset_index(drop=True)
+        self.categories = sorted(self.frame['category'].dropna().unique())
+        amounts = self.frame['amount'].dropna()
+        self.price_bounds = (float(amounts.min()), float(amounts.max())) if len(amounts) else (0.0, 0.0)
+        # Ascending and descending orders per sort key, missing values last in both
+        self._orders = {}
+        for key in self.SORT_KEYS:
+            column = self.frame[key]
+            ascending = column.sort_values(kind='stable', na_position='last').index.to_numpy()
+            descending = column.sort_values(ascending=False, kind='stable', na_position='last').index.to_numpy()
+            self._orders[key] = (ascending, descending)
+    
+    def match(self, competitors: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              monthly: Optional[bool] = None, min_discount: Optional[float] = None,
+              sort: str = 'amount', descending: bool = False) -> np.ndarray:
+        """Row positions of the matching offers in sort order"""
+        frame = self.frame
+        mask = np.ones(len(frame), dtype=bool)
+        if competitors is not None:
+            mask &= frame['competitor'].isin(competitors).to_numpy()
+        if categories:
+            mask &= frame['category'].isin(categories).to_numpy()
+        if min_price is not None:
+            mask &= (frame['amount'] >= min_price).fillna(False).to_numpy()
+        if max_price is not None:
+            mask &= (frame['amount'] <= max_price).fillna(False).to_numpy()
+        if monthly is not None:
+            mask &= (frame['monthly'] == monthly).to_numpy()
+        if min_discount:
+            mask &= (frame['discount_pct'] >= min_discount).fillna(False).to_numpy()
+        
+        order = self._orders[sort][descending]
+        return order[mask[order]]
+    
+    def page(self, rows: np.ndarray, page: int = 0, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+        """Offers of one page of ``rows``"""
+        start = max(0, page) * page_size
+        return self.frame.iloc[rows[start:start + page_size]]
+
+
+def build_offer_index(offers: pd.DataFrame) -> OfferIndex:
+    return OfferIndex(offers)
@@ -0,0 +1,122 @@
+"""
+AMAG Competitor Intelligence Politeness
+Per-host rate limits, concurrency caps and robots.txt handling for the fetch engine
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Defaults per host; robots.txt Crawl-delay can only make them stricter
+HOST_RATE = 1.0        # requests per second
+HOST_BURST = 2         # requests allowed back-to-back
+HOST_CONCURRENCY = 2   # parallel requests
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class TokenBucket:
+    """Reservation-based token bucket; callers sleep for the returned delay"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def slow_down(self, rate: float):
+        with self._lock:
+            self.rate = min(self.rate, rate)
+            self.capacity = 1
+
+
+class HostPolicy:
+    """Rate limit, concurrency cap and robots rules for one host"""
+
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_loaded = threading.Event()
+
+
+class Politeness:
+    """Shared per-host scheduling state for all fetch workers"""
+
+    def __init__(self, fetch_text: Callable[[str], Optional[str]], user_agent: str,
+                 rate: float = HOST_RATE, burst: int = HOST_BURST, concurrency: int = HOST_CONCURRENCY):
+        self._fetch_text = fetch_text
+        self.user_agent = user_agent
+        self.rate, self.burst, self.concurrency = rate, burst, concurrency
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._lock = threading.Lock()
+
+    def _policy(self, url: str) -> HostPolicy:
+        host = host_of(url)
+        with self._lock:
+            policy = self._hosts.get(host)
+            if policy is None:
+                policy = self._hosts[host] = HostPolicy(self.rate, self.burst, self.concurrency)
+                load_robots = True
+            else:
+                load_robots = False
+        if load_robots:
+            self._load_robots(url, policy)
+        policy.robots_loaded.wait()
+        return policy
+
+    def _load_robots(self, url: str, policy: HostPolicy):
+        parts = urlsplit(url)
+        try:
+            text = self._fetch_text(f"{parts.scheme}://{parts.netloc}/robots.txt")
+            if text is not None:
+                robots = RobotFileParser()
+                robots.parse(text.splitlines())
+                policy.robots = robots
+                delay = robots.crawl_delay(self.user_agent)
+                if delay:
+                    policy.bucket.slow_down(1 / float(delay))
+        finally:
+            policy.robots_loaded.set()
+
+    def allowed(self, url: str) -> bool:
+        """Whether robots.txt permits fetching ``url``"""
+        robots = self._policy(url).robots
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Wait for a free connection slot and a rate token for the URL's host"""
+        policy = self._policy(url)
+        with policy.slots:
+            delay = policy.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+            yield
+
+
+def interleave_by_host(items: List[Tuple[str, Dict]], url_key: str = 'aktionen_url') -> List[Tuple[str, Dict]]:
+    """Round-robin over hosts so workers don't queue up behind one host's rate limit"""
+    by_host: Dict[str, List[Tuple[str, Dict]]] = {}
+    for name, config in items:
+        by_host.setdefault(host_of(config[url_key]), []).append((name, config))
+    queues = list(by_host.values())
+    ordered = []
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return ordered
@@ -0,0 +1,154 @@
+"""
+AMAG Competitor Intelligence Re-extraction
+Replays archived pages through the current extractors and rewrites stored snapshots, offline
+
+    python reextract.py
+    python reextract.py --competitor "Emil Frey" --since 2026-01-01 --workers 4
+"""
+
+import argparse
+import logging
+import os
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from archive import PageArchive
+from intelligence import (
+    COMPETITORS,
+    PAGE_ARCHIVE_DIR,
+    CompetitorIntelligence,
+    HttpCache,
+    SnapshotStore,
+    track_changes,
+)
+
+logger = logging.getLogger('reextract')
+
+# Pages handed to a worker per round trip
+EXTRACT_CHUNK_SIZE = 16
+
+# Per-process state of the extraction workers
+_archive: Optional[PageArchive] = None
+_extractor: Optional[CompetitorIntelligence] = None
+
+
+def _init_worker(archive_root: Path):
+    global _archive, _extractor
+    _archive = PageArchive(archive_root)
+    _extractor = CompetitorIntelligence.offline()
+
+
+def _extract(task: Tuple[str, Dict, str]) -> Tuple[Tuple[str, str], Optional[Dict]]:
+    """Page record for one archived body under a competitor's current config"""
+    name, config, digest = task
+    content = _archive.get(digest)
+    return (name, digest), (None if content is None else _extractor._extract_page(config, content))
+
+
+def extract_pages(tasks: List[Tuple[str, Dict, str]], archive: PageArchive,
+                  workers: Optional[int] = None) -> Dict[Tuple[str, str], Optional[Dict]]:
+    """Extract each distinct (competitor, body) once, spread over all cores"""
+    if not tasks:
+        return {}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(archive.root,)) as pool:
+        return dict(pool.map(_extract, tasks, chunksize=EXTRACT_CHUNK_SIZE))
+
+
+def reextract(store: SnapshotStore, archive: PageArchive, competitors: Dict[str, Dict] = COMPETITORS,
+              since: Optional[datetime] = None, workers: Optional[int] = None,
+              dry_run: bool = False, http_cache: Optional[HttpCache] = None) -> Counter:
+    """Rebuild archived live snapshots from their pages and write them back.
+
+    Only snapshots with a page manifest (scraped since pages are archived)
+    can be replayed. Snapshots missing an archived page, or yielding no
+    offers under the current selectors, keep their stored result. Change
+    tracking is replayed in order, so first_seen and new_this_week follow the
+    re-extracted offers. Snapshots are streamed twice, once for the pages to
+    extract and once to rewrite, so memory holds extracted pages, not
+    history. The ``http_cache`` entries of the pages of rewritten
+    competitors are discarded, so the next scrape cannot store results
+    extracted before the rewrite. Returns counts per outcome.
+    """
+    stats = Counter()
+    since_stamp = since.isoformat(timespec='seconds') if since else ''
+    tasks = {}
+    urls: Dict[str, Set[str]] = defaultdict(set)
+    for snapshot in store.iter_snapshots(list(competitors)):
+        if _replayable(snapshot, since_stamp):
+            name = snapshot['competitor']
+            for url, digest in snapshot['pages']:
+                tasks.setdefault((name, digest), (name, competitors[name], digest))
+                urls[name].add(url)
+    logger.info('%d distinct pages to extract', len(tasks))
+    pages = extract_pages(list(tasks.values()), archive, workers)
+    stats['pages'] = len(pages)
+
+    rewritten: Set[str] = set()
+    updates = _rebuilt(store.iter_snapshots(list(competitors), with_ids=True), since_stamp, pages, stats,
+                       rewritten)
+    if dry_run:
+        deque(updates, maxlen=0)
+    else:
+        store.rewrite(updates)
+        if http_cache is not None:
+            stats['cache_discarded'] = http_cache.discard(url for name in rewritten for url in urls[name])
+            http_cache.flush()
+    return stats
+
+
+def _replayable(snapshot: Dict, since_stamp: str) -> bool:
+    return snapshot.get('source') == 'live' and bool(snapshot.get('pages')) and snapshot['scraped_at'] >= since_stamp
+
+
+def _rebuilt(snapshots: Iterator[Dict], since_stamp: str, pages: Dict[Tuple[str, str], Optional[Dict]],
+             stats: Counter, rewritten: Set[str]) -> Iterator[Tuple[int, Dict]]:
+    """(snapshot id, result) for each replayed snapshot, oldest first; adds their competitors to ``rewritten``"""
+    assembler = CompetitorIntelligence.offline()
+    previous: Dict[str, Dict] = {}  # Last live result per competitor, for change tracking
+    for snapshot in snapshots:
+        name = snapshot['competitor']
+        if not _replayable(snapshot, since_stamp):
+            if snapshot.get('source') == 'live':
+                previous[name] = snapshot
+            continue
+        records = [pages.get((name, digest)) for _, digest in snapshot['pages']]
+        if any(record is None for record in records):
+            stats['missing_pages'] += 1
+            previous[name] = snapshot
+            continue
+        result = assembler._assemble(records)
+        if not result['aktionen']:
+            stats['no_offers'] += 1
+            previous[name] = snapshot
+            continue
+        result['last_update'] = snapshot.get('last_update', result['last_update'])
+        result['pages'] = snapshot['pages']
+        result = previous[name] = track_changes(result, previous.get(name),
+                                                now=datetime.fromisoformat(snapshot['scraped_at']))
+        stats['rewritten'] += 1
+        rewritten.add(name)
+        yield snapshot['snapshot_id'], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-extract stored snapshots from archived pages')
+    parser.add_argument('--competitor', action='append', help='repeat to re-extract several competitors')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='ISO date/time, inclusive')
+    parser.add_argument('--workers', type=int, help='extraction processes (default: all cores)')
+    parser.add_argument('--dry-run', action='store_true', help='extract and report without writing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    competitors = {name: config for name, config in COMPETITORS.items()
+                   if not args.competitor or name in args.competitor}
+    stats = reextract(SnapshotStore(), PageArchive(PAGE_ARCHIVE_DIR), competitors, args.since,
+                      args.workers, args.dry_run, HttpCache())
+    logger.info('Re-extraction %s: %s', 'dry run' if args.dry_run else 'done', dict(stats))
+
+
+if __name__ == '__main__':
+    main()
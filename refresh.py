@@ -0,0 +1,84 @@
+"""
+AMAG Competitor Intelligence Refresh
+Process-wide single-flight refresh shared by concurrent dashboard sessions
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+# Seconds a finished refresh is replayed instead of scraping again
+REFRESH_FRESHNESS_SECONDS = float(os.environ.get('AMAG_CI_REFRESH_FRESHNESS', 60))
+
+
+class _Flight:
+    """One refresh run; results accumulate for every session that joined it"""
+
+    def __init__(self, names: FrozenSet[str]):
+        self.names = names
+        self.results: List[Tuple[str, Dict]] = []
+        self.finished: Optional[float] = None  # monotonic
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    def follow(self, names: FrozenSet[str]) -> Iterator[Tuple[str, Dict]]:
+        """Results for ``names`` already in, then the rest as they arrive"""
+        seen = 0
+        while True:
+            with self.cond:
+                while seen == len(self.results) and self.finished is None:
+                    self.cond.wait()
+                if seen == len(self.results):
+                    break
+                name, result = self.results[seen]
+            seen += 1
+            if name in names:
+                yield name, result
+        if self.error is not None:
+            raise self.error
+
+
+class RefreshCoordinator:
+    """Runs at most one scrape per competitor set at a time.
+
+    A request joins an in-flight refresh that covers its competitors, or
+    replays one that finished within the freshness window; only otherwise
+    does a new refresh start. Scrapes run on their own thread, so a session
+    that reruns or disconnects never cuts short a refresh others wait for.
+    """
+
+    def __init__(self, run: Callable[[Dict[str, Dict]], Iterable[Tuple[str, Dict]]],
+                 freshness: float = REFRESH_FRESHNESS_SECONDS):
+        self.run = run
+        self.freshness = freshness
+        self._lock = threading.Lock()
+        self._flights: List[_Flight] = []
+
+    def refresh(self, competitors: Dict[str, Dict]) -> Tuple[str, Iterator[Tuple[str, Dict]]]:
+        """('started' | 'joined' | 'fresh', results as (name, result) pairs)"""
+        names = frozenset(competitors)
+        now = time.monotonic()
+        with self._lock:
+            self._flights = [f for f in self._flights
+                             if f.finished is None or (f.error is None and now - f.finished < self.freshness)]
+            for flight in self._flights:
+                if names <= flight.names:
+                    return ('joined' if flight.finished is None else 'fresh'), flight.follow(names)
+            flight = _Flight(names)
+            self._flights.append(flight)
+        threading.Thread(target=self._run, args=(flight, competitors), name='refresh', daemon=True).start()
+        return 'started', flight.follow(names)
+
+    def _run(self, flight: _Flight, competitors: Dict[str, Dict]):
+        try:
+            for item in self.run(competitors):
+                with flight.cond:
+                    flight.results.append(item)
+                    flight.cond.notify_all()
+        except BaseException as exc:
+            flight.error = exc
+        finally:
+            with flight.cond:
+                flight.finished = time.monotonic()
+                flight.cond.notify_all()
@@ -0,0 +1,156 @@
+"""
+AMAG Competitor Intelligence Rollups
+Daily and weekly price and discount aggregates, maintained at ingest
+"""
+
+import sqlite3
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from matching import match_models
+from offers import normalize_offer
+
+GRAINS = ('day', 'week')
+ALL = '*'                  # category/model of the per-competitor total rows
+TREND_MAX_POINTS = 60      # points per series after downsampling
+# Stored as PRAGMA user_version; bump when rollup_rows changes so stored rollups are rebuilt
+ROLLUP_VERSION = 4
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollups (
+        grain TEXT NOT NULL,            -- 'day' or 'week'
+        period TEXT NOT NULL,           -- ISO date of the day, or of the week's Monday
+        competitor TEXT NOT NULL,
+        category TEXT NOT NULL,         -- '*' in per-competitor totals
+        model TEXT NOT NULL,            -- '*' in per-competitor totals
+        monthly INTEGER NOT NULL,       -- leasing rates and one-off prices never mix
+        offers INTEGER NOT NULL,        -- offer observations
+        priced INTEGER NOT NULL,
+        price_sum REAL NOT NULL,
+        price_min REAL,
+        price_max REAL,
+        discounted INTEGER NOT NULL,
+        discount_sum REAL NOT NULL,
+        PRIMARY KEY (grain, period, competitor, category, model, monthly)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_rollups_model ON rollups (grain, model, period);
+"""
+
+_UPSERT = """
+    INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (grain, period, competitor, category, model, monthly) DO UPDATE SET
+        offers = offers + excluded.offers,
+        priced = priced + excluded.priced,
+        price_sum = price_sum + excluded.price_sum,
+        price_min = MIN(COALESCE(price_min, excluded.price_min), COALESCE(excluded.price_min, price_min)),
+        price_max = MAX(COALESCE(price_max, excluded.price_max), COALESCE(excluded.price_max, price_max)),
+        discounted = discounted + excluded.discounted,
+        discount_sum = discount_sum + excluded.discount_sum
+"""
+
+
+def period_of(day: date, grain: str) -> str:
+    return (day - timedelta(days=day.weekday()) if grain == 'week' else day).isoformat()
+
+
+def rollup_rows(competitor: str, scraped_at: str, aktionen: Iterable[Dict]) -> List[Tuple]:
+    """Rollup increments for one snapshot, per model and per competitor total.
+
+    Models are the price comparison's labels (matching.match_models), so
+    title variants such as 'A 180 Edition' and 'A-Klasse 10% Rabatt' share
+    one series. Offers matching no model only count toward the totals.
+    """
+    day = datetime.fromisoformat(scraped_at).date()
+    aktionen = [normalize_offer(aktion) for aktion in aktionen]
+    labels = match_models(aktion.get('title') or '' for aktion in aktionen)
+    totals: Dict[Tuple, List] = defaultdict(lambda: [0, 0, 0.0, None, None, 0, 0.0])
+    for aktion in aktionen:
+        category = aktion.get('type') or 'N/A'
+        model = labels[aktion.get('title') or '']
+        keys = [(ALL, ALL, aktion['monthly'])]
+        if model is not None:
+            keys.append((category, model, aktion['monthly']))
+        amount, discount = aktion['amount'], aktion['discount_pct']
+        for key in keys:
+            t = totals[key]
+            t[0] += 1
+            if amount is not None:
+                t[1] += 1
+                t[2] += amount
+                t[3] = amount if t[3] is None else min(t[3], amount)
+                t[4] = amount if t[4] is None else max(t[4], amount)
+            if discount is not None:
+                t[5] += 1
+                t[6] += discount
+    return [(grain, period_of(day, grain), competitor, category, model, int(monthly), *t)
+            for grain in GRAINS for (category, model, monthly), t in totals.items()]
+
+
+def apply_rollups(conn: sqlite3.Connection, rows: List[Tuple]):
+    """Add increments; runs inside the caller's transaction"""
+    conn.executemany(_UPSERT, rows)
+
+
+def query_trend(conn: sqlite3.Connection, metric: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None, competitors: Optional[List[str]] = None,
+                model: Optional[str] = None, monthly: bool = False,
+                max_points: int = TREND_MAX_POINTS) -> List[Dict]:
+    """Average price or discount per competitor and period.
+
+    Daily rows serve ranges up to ``max_points`` days, weekly rows anything
+    longer; longer weekly series are merged into ``max_points`` buckets, so
+    the number of points per series is bounded whatever the range.
+    """
+    until = until or datetime.now()
+    if since is None:
+        first = conn.execute("SELECT MIN(period) FROM rollups WHERE grain = 'day'").fetchone()[0]
+        since = datetime.fromisoformat(first) if first else until
+    grain = 'day' if (until - since).days <= max_points else 'week'
+
+    value, count = ('price_sum', 'priced') if metric == 'price' else ('discount_sum', 'discounted')
+    query = (f"SELECT period, competitor, SUM({value}), SUM({count}) FROM rollups "
+             "WHERE grain = ? AND period >= ? AND period <= ? AND monthly = ?")
+    params = [grain, period_of(since.date(), grain), until.date().isoformat(), int(monthly)]
+    if model is None:
+        query += ' AND model = ? AND category = ?'
+        params += [ALL, ALL]
+    else:
+        query += ' AND model = ?'
+        params.append(model)
+    if competitors is not None:
+        query += f" AND competitor IN ({', '.join('?' * len(competitors))})"
+        params += competitors
+    rows = conn.execute(query + ' GROUP BY period, competitor ORDER BY period', params).fetchall()
+    return downsample(rows, max_points)
+
+
+def downsample(rows: List[Tuple], max_points: int) -> List[Dict]:
+    """Merge consecutive periods into at most ``max_points`` buckets per competitor.
+
+    Buckets add up sums and counts, so bucket averages stay exact.
+    """
+    periods = sorted({period for period, *_ in rows})
+    # Each bucket is labelled with its first period
+    bucket_of, labels = {}, {}
+    for i, period in enumerate(periods):
+        bucket_of[period] = labels.setdefault(i * max_points // len(periods), period)
+    merged: Dict[Tuple[str, str], List] = defaultdict(lambda: [0.0, 0])
+    for period, competitor, total, count in rows:
+        bucket = merged[(bucket_of[period], competitor)]
+        bucket[0] += total or 0
+        bucket[1] += count or 0
+    return [{'period': period, 'competitor': competitor, 'value': total / count, 'observations': count}
+            for (period, competitor), (total, count) in sorted(merged.items()) if count]
+
+
+def top_models(conn: sqlite3.Connection, competitors: Optional[List[str]] = None, monthly: bool = False,
+               limit: int = 50) -> List[str]:
+    """Models with the most priced weekly observations across competitors, as the price comparison labels them"""
+    query = "SELECT model, SUM(priced) AS n FROM rollups WHERE grain = 'week' AND model != ? AND monthly = ?"
+    params: List = [ALL, int(monthly)]
+    if competitors is not None:
+        query += f" AND competitor IN ({', '.join('?' * len(competitors))})"
+        params += competitors
+    rows = conn.execute(query + ' GROUP BY model HAVING n > 0 ORDER BY n DESC, model LIMIT ?', params + [limit]).fetchall()
+    return [model for model, _ in rows]
@@ -0,0 +1,146 @@
+"""
+AMAG Competitor Intelligence Rules
+Declarative alert rules compiled once and evaluated over the offer table
+"""
+
+import operator
+import re
+import string
+import tomllib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+RULES_PATH = Path(__file__).parent / 'alerts.toml'
+
+LEVEL_ICONS = {'critical': '🔴', 'warning': '🟡', 'info': '🔵'}
+
+_OPERATORS = {
+    '>=': operator.ge, '>': operator.gt, '<=': operator.le,
+    '<': operator.lt, '==': operator.eq, '!=': operator.ne,
+}
+
+# Aggregates over our own offers that clauses can compare against
+REFERENCES: Dict[str, Callable[[pd.DataFrame], Optional[float]]] = {
+    'own_min_monthly': lambda own: own.loc[own['monthly'], 'amount'].min(),
+    'own_min_price': lambda own: own.loc[~own['monthly'], 'amount'].min(),
+    'own_max_discount': lambda own: own['discount_pct'].max(),
+}
+
+Clause = Callable[[pd.DataFrame, pd.DataFrame], pd.Series]
+
+
+def compile_clause(spec: Dict) -> Clause:
+    """Turn one `when` entry into a vectorized mask function"""
+    column = spec['column']
+    if 'contains' in spec:
+        pattern = re.compile('|'.join(re.escape(t) for t in spec['contains']), re.IGNORECASE)
+        return lambda offers, own: offers[column].str.contains(pattern, na=False)
+
+    compare = _OPERATORS[spec['op']]
+    if 'reference' in spec:
+        reference = REFERENCES[spec['reference']]
+
+        def clause(offers: pd.DataFrame, own: pd.DataFrame) -> pd.Series:
+            value = reference(own)
+            if pd.isna(value):  # Nothing of ours to compare with
+                return pd.Series(False, index=offers.index)
+            return compare(offers[column], value).fillna(False)
+        return clause
+
+    value = spec['value']
+    return lambda offers, own: compare(offers[column], value).fillna(False)
+
+
+@dataclass
+class Rule:
+    id: str
+    level: str
+    priority: int
+    message: str
+    clauses: List[Clause]
+
+    def messages(self, matched: pd.DataFrame) -> List[str]:
+        """Format the message for each matched offer, reading only the columns it uses"""
+        fields = [f for _, f, _, _ in string.Formatter().parse(self.message) if f]
+        if not fields:
+            return [self.message] * len(matched)
+        columns = [matched[f].tolist() for f in fields]
+        return [self.message.format(**dict(zip(fields, values))) for values in zip(*columns)]
+
+    def mask(self, offers: pd.DataFrame, own: pd.DataFrame) -> pd.Series:
+        mask = pd.Series(True, index=offers.index)
+        for clause in self.clauses:
+            mask &= clause(offers, own).astype(bool)
+        return mask
+
+
+class RuleSet:
+    """Compiled alert rules from alerts.toml"""
+
+    def __init__(self, config: Dict):
+        self.own_competitor = config.get('own_competitor', 'AMAG')
+        self.max_alerts = config.get('max_alerts', 0)
+        self.content_gap = config.get('content_gap')
+        self.rules = [
+            Rule(id=spec['id'], level=spec['level'], priority=spec.get('priority', 0),
+                 message=spec['message'], clauses=[compile_clause(c) for c in spec.get('when', [])])
+            for spec in config.get('rule', [])
+        ]
+
+    @classmethod
+    def load(cls, path: Path = RULES_PATH) -> 'RuleSet':
+        with open(path, 'rb') as f:
+            return cls(tomllib.load(f))
+
+    def evaluate(self, data: Dict, offers: pd.DataFrame) -> List[Dict]:
+        """All alerts for the offer table, deduplicated and ranked by priority"""
+        own = offers[offers['competitor'] == self.own_competitor]
+        rivals = offers[offers['competitor'] != self.own_competitor]
+
+        hits = []
+        for rule in self.rules:
+            for message in rule.messages(rivals[rule.mask(rivals, own)]):
+                hits.append({'level': rule.level, 'icon': LEVEL_ICONS.get(rule.level, ''),
+                             'message': message, 'rule': rule.id, 'priority': rule.priority})
+
+        if self.content_gap and (gap := self._content_gap(data)):
+            hits.append(gap)
+
+        seen = set()
+        unique = []
+        for hit in hits:
+            if hit['message'] not in seen:
+                seen.add(hit['message'])
+                unique.append(hit)
+        # Stable sort keeps offer order within equal priority
+        ranked = sorted(unique, key=lambda hit: -hit['priority'])
+        return ranked[:self.max_alerts] if self.max_alerts else ranked
+
+    def _content_gap(self, data: Dict) -> Optional[Dict]:
+        our_keywords = set(data.get(self.own_competitor, {}).get('keywords', []))
+        competitor_keywords = set()
+        for comp, comp_data in data.items():
+            if comp != self.own_competitor:
+                competitor_keywords.update(comp_data.get('keywords', []))
+
+        missing = sorted(competitor_keywords - our_keywords)
+        if not missing:
+            return None
+        level = self.content_gap.get('level', 'warning')
+        return {'level': level, 'icon': LEVEL_ICONS.get(level, ''),
+                'message': f"Content Gap: Fehlende Keywords - {', '.join(missing[:self.content_gap.get('max_keywords', 3)])}",
+                'rule': 'content_gap', 'priority': self.content_gap.get('priority', 0)}
+
+
+@lru_cache(maxsize=4)
+def _compiled_rule_set(path: Path, mtime: float) -> RuleSet:
+    return RuleSet.load(path)
+
+
+def get_rule_set(path: Path = RULES_PATH) -> RuleSet:
+    """Compiled rules, recompiled only when the config file changes"""
+    return _compiled_rule_set(path, path.stat().st_mtime)
@@ -0,0 +1,80 @@
+"""
+AMAG Competitor Intelligence Scheduler
+Headless scrape runner that feeds the dashboard's snapshot store
+
+    python scheduler.py --once
+    python scheduler.py --interval 1800 --jitter 0.2
+"""
+
+import argparse
+import logging
+import random
+import signal
+import threading
+import time
+
+from intelligence import (
+    COMPETITORS,
+    FETCH_MAX_WORKERS,
+    CompetitorIntelligence,
+    SnapshotStore,
+    run_refresh,
+)
+
+logger = logging.getLogger('scheduler')
+
+
+def refresh_once(scraper: CompetitorIntelligence, store: SnapshotStore, **fetch_options) -> int:
+    """Run one full refresh and return the number of live results"""
+    started = time.monotonic()
+    live = 0
+    for name, result in run_refresh(scraper, store, **fetch_options):
+        is_live = result.get('source') == 'live'
+        live += is_live
+        if is_live:
+            logger.info('%s: live (%d Aktionen)', name, len(result.get('aktionen', [])))
+        else:
+            logger.info('%s: %s (%s)', name, result.get('source'), result.get('error'))
+    logger.info('Refresh done: %d/%d live in %.1fs', live, len(COMPETITORS), time.monotonic() - started)
+    return live
+
+
+def next_delay(interval: float, jitter: float) -> float:
+    """Interval with +/- jitter fraction so runs don't align across hosts"""
+    return max(0.0, interval * (1 + random.uniform(-jitter, jitter)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape competitors on a schedule')
+    parser.add_argument('--once', action='store_true', help='run a single refresh and exit')
+    parser.add_argument('--interval', type=float, default=3600, help='seconds between refreshes')
+    parser.add_argument('--jitter', type=float, default=0.1, help='random +/- fraction of the interval')
+    parser.add_argument('--workers', type=int, default=FETCH_MAX_WORKERS, help='parallel fetches across all hosts')
+    parser.add_argument('--deadline', type=float, default=600, help='seconds budget per refresh')
+    args = parser.parse_args()
+    fetch_options = {'max_workers': args.workers, 'deadline': args.deadline}
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    scraper = CompetitorIntelligence()
+    store = SnapshotStore()
+
+    if args.once:
+        refresh_once(scraper, store, **fetch_options)
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    while not stop.is_set():
+        try:
+            refresh_once(scraper, store, **fetch_options)
+        except Exception:
+            logger.exception('Refresh failed')
+        delay = next_delay(args.interval, args.jitter)
+        logger.info('Next refresh in %.0fs', delay)
+        stop.wait(delay)
+
+
+if __name__ == '__main__':
+    main()
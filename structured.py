@@ -0,0 +1,194 @@
+"""
+AMAG Competitor Intelligence Structured Data
+schema.org offers from JSON-LD and microdata, read before any CSS selector
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+from crawl import parse_html
+
+# schema.org types describing the vehicle or product an offer is for
+PRODUCT_TYPES = {'Product', 'Car', 'Vehicle', 'Motorcycle', 'BusOrCoach', 'IndividualProduct', 'ProductModel'}
+OFFER_TYPES = {'Offer', 'AggregateOffer'}
+# unitCode / billingDuration values that mark a monthly (leasing) price
+MONTHLY_UNITS = {'MON', 'P1M', 'MONTH', 'MONTHLY'}
+
+_JSON_LD = re.compile(
+    rb'<script\b[^>]*?type\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+_COMMENT_WRAPPER = re.compile(r'^\s*(?:<!--|<!\[CDATA\[)|(?:-->|\]\]>)\s*$')
+
+
+def extract_structured_offers(content: bytes) -> List[List]:
+    """[title, price, category] per schema.org offer; empty when the page has none.
+
+    JSON-LD is found by scanning the raw bytes for its script tags, so pages
+    without structured data cost one substring search; microdata needs a
+    parse and is only tried when ``itemtype`` occurs at all.
+    """
+    offers = []
+    if b'ld+json' in content:
+        offers = _collect(_json_ld_nodes(content))
+    if not offers and b'itemtype' in content:
+        offers = _collect(_microdata_nodes(content))
+    return [list(offer) for offer in dict.fromkeys(offers)]
+
+
+def covers_listing(content: bytes, offers: List[List]) -> bool:
+    """Whether structured offers stand for the whole listing.
+
+    An ``ItemList`` or several offers describe the listing itself; a single
+    product is often just the page's featured offer next to other cards.
+    """
+    return len(offers) > 1 or (bool(offers) and b'ItemList' in content)
+
+
+def _json_ld_nodes(content: bytes) -> Iterable:
+    for match in _JSON_LD.finditer(content):
+        raw = _COMMENT_WRAPPER.sub('', match.group(1).decode('utf-8', errors='replace'))
+        try:
+            yield json.loads(raw, strict=False)
+        except ValueError:
+            continue  # Broken blocks are common; the selectors still run if nothing parses
+
+
+def _microdata_nodes(content: bytes) -> Iterable:
+    from lxml import etree
+
+    try:
+        root = parse_html(content)
+    except (etree.ParserError, ValueError):
+        return
+    for scope in root.xpath('//*[@itemscope and not(@itemprop)]'):
+        yield _microdata_item(scope)
+
+
+def _microdata_item(scope) -> Dict:
+    """Microdata item as a JSON-LD-like dict"""
+    item = {'@type': [t.rsplit('/', 1)[-1] for t in (scope.get('itemtype') or '').split()]}
+    for el in scope.iterdescendants():
+        prop = el.get('itemprop')
+        if not prop or _item_scope(el) is not scope:
+            continue
+        if el.get('itemscope') is not None:
+            value = _microdata_item(el)
+        else:
+            value = el.get('content') or el.get('href') or el.get('src') or el.text_content().strip()
+        for name in prop.split():
+            item.setdefault(name, value)
+    return item
+
+
+def _item_scope(el):
+    """Nearest enclosing itemscope element"""
+    node = el.getparent()
+    while node is not None and node.get('itemscope') is None:
+        node = node.getparent()
+    return node
+
+
+def _collect(nodes: Iterable) -> List[tuple]:
+    offers = []
+    for node in nodes:
+        _walk(node, offers)
+    return offers
+
+
+def _walk(node, out: List[tuple]):
+    if isinstance(node, list):
+        for child in node:
+            _walk(child, out)
+        return
+    if not isinstance(node, dict):
+        return
+    types = _types(node)
+    if types & PRODUCT_TYPES:
+        out.extend(_product_offers(node))
+        return
+    if types & OFFER_TYPES:
+        title = _name(node.get('itemOffered')) or _text(node.get('name'))
+        if title:
+            out.append((title, _price(node), _category({}, node)))
+        return
+    for value in node.values():  # @graph, ItemList.itemListElement, ...
+        if isinstance(value, (dict, list)):
+            _walk(value, out)
+
+
+def _product_offers(product: Dict) -> List[tuple]:
+    title = _name(product)
+    if not title:
+        return []
+    offers = product.get('offers')
+    offers = [o for o in (offers if isinstance(offers, list) else [offers]) if isinstance(o, dict)]
+    if not offers:
+        return [(title, None, _category(product, {}))]
+    return [(title, _price(offer), _category(product, offer)) for offer in offers]
+
+
+def _types(node: Dict) -> set:
+    types = node.get('@type') or []
+    if isinstance(types, str):
+        types = [types]
+    return {str(t).rsplit('/', 1)[-1].rsplit(':', 1)[-1] for t in types}
+
+
+def _text(value) -> str:
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('@value')
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    return ' '.join(str(value).split()) if value else ''
+
+
+def _name(product) -> str:
+    """Product name, or brand and model when the name is missing"""
+    if not isinstance(product, dict):
+        return _text(product)
+    name = _text(product.get('name'))
+    if name:
+        return name
+    return ' '.join(part for part in (_text(product.get('brand')), _text(product.get('model'))) if part)
+
+
+def _price(offer: Dict) -> Optional[str]:
+    """Price text in the format the selector path produces, e.g. "CHF 29'900" or "CHF 299/Mt" """
+    specs = offer.get('priceSpecification') or []
+    specs = [s for s in (specs if isinstance(specs, list) else [specs]) if isinstance(s, dict)]
+    spec = next((s for s in specs if s.get('price') is not None), {})
+
+    amount = offer.get('price', offer.get('lowPrice'))
+    if amount is None:
+        amount = spec.get('price')
+    if amount in (None, ''):
+        return None
+    currency = _text(offer.get('priceCurrency') or spec.get('priceCurrency')) or 'CHF'
+    units = {str(s.get(key, '')).upper() for s in specs for key in ('unitCode', 'billingDuration', 'unitText')}
+    monthly = bool(units & MONTHLY_UNITS)
+
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        formatted = str(amount)  # Already formatted text such as "29'900.–"
+    else:
+        formatted = f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+        formatted = formatted.replace(',', "'")
+    return f"{currency} {formatted}{'/Mt' if monthly else ''}"
+
+
+def _category(product: Dict, offer: Dict) -> Optional[str]:
+    """Offer type from price unit, fuel type or condition"""
+    if offer and (_price(offer) or '').endswith('/Mt'):
+        return 'Leasing'
+    fuel = _text(product.get('fuelType')).lower()
+    if 'electric' in fuel or 'elektr' in fuel:
+        return 'Elektro'
+    condition = _text(offer.get('itemCondition') or product.get('itemCondition'))
+    if 'NewCondition' in condition:
+        return 'Neuwagen'
+    if 'UsedCondition' in condition:
+        return 'Occasion'
+    return None
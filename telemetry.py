@@ -0,0 +1,181 @@
+"""
+AMAG Competitor Intelligence Telemetry
+Timing spans for the scrape and render hot paths, exported as Prometheus text or JSON
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket bounds in seconds
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Individual spans kept for the diagnostics panel
+RECENT_SPANS = 500
+
+METRIC_PREFIX = 'amag_ci'
+
+# Labels of the enclosing span; nested spans inherit them (e.g. the competitor)
+_current_labels: ContextVar[Dict[str, str]] = ContextVar('span_labels', default={})
+
+
+@dataclass
+class Span:
+    """One finished span; attributes are set by the instrumented code while it runs"""
+    name: str
+    labels: Dict[str, str]
+    started: float
+    duration: float
+    error: Optional[str] = None
+    attrs: Dict = field(default_factory=dict)
+
+
+@dataclass
+class _Series:
+    """Aggregates for one span name and label set"""
+    buckets: List[int]
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    bytes: int = 0
+    errors: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+
+
+class Telemetry:
+    """Thread-safe span recorder with histogram aggregates per (span, labels)"""
+
+    def __init__(self, recent: int = RECENT_SPANS, buckets: Tuple[float, ...] = SPAN_BUCKETS):
+        self.bounds = buckets
+        self.recent: deque = deque(maxlen=recent)
+        self._series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Series] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[Dict]:
+        """Time the block; yields a dict for ``bytes``, ``status`` and ``error`` attributes.
+
+        Exceptions are recorded with their class name and re-raised.
+        """
+        merged = {**_current_labels.get(), **{k: str(v) for k, v in labels.items()}}
+        token = _current_labels.set(merged)
+        attrs: Dict = {}
+        started = time.time()
+        begin = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as exc:
+            attrs.setdefault('error', type(exc).__name__)
+            raise
+        finally:
+            _current_labels.reset(token)
+            self.record(name, time.perf_counter() - begin, merged, attrs, started)
+
+    def record(self, name: str, duration: float, labels: Dict[str, str], attrs: Optional[Dict] = None,
+               started: Optional[float] = None):
+        """Add a span measured elsewhere"""
+        attrs = dict(attrs or {})
+        span = Span(name, labels, started or time.time() - duration, duration, attrs.pop('error', None), attrs)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(buckets=[0] * len(self.bounds))
+            series.count += 1
+            series.total += duration
+            series.max = max(series.max, duration)
+            index = bisect_left(self.bounds, duration)
+            if index < len(self.bounds):
+                series.buckets[index] += 1
+            series.bytes += attrs.get('bytes', 0)
+            if 'status' in attrs:
+                series.statuses[str(attrs['status'])] += 1
+            if span.error:
+                series.errors[span.error] += 1
+            self.recent.append(span)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.recent.clear()
+
+    def summary(self) -> List[Dict]:
+        """One row per series, slowest average first"""
+        with self._lock:
+            rows = [{'span': name, **dict(labels), 'count': s.count,
+                     'avg_ms': s.total / s.count * 1000, 'max_ms': s.max * 1000,
+                     'bytes': s.bytes, 'errors': sum(s.errors.values()),
+                     'error_classes': ', '.join(sorted(s.errors))}
+                    for (name, labels), s in self._series.items()]
+        return sorted(rows, key=lambda row: row['avg_ms'], reverse=True)
+
+    def to_json(self) -> str:
+        with self._lock:
+            series = [{'span': name, 'labels': dict(labels), 'count': s.count, 'sum_s': s.total,
+                       'max_s': s.max, 'bytes': s.bytes, 'errors': dict(s.errors), 'statuses': dict(s.statuses),
+                       'buckets': dict(zip(map(str, self.bounds), _cumulative(s.buckets)))}
+                      for (name, labels), s in self._series.items()]
+            recent = [asdict(span) for span in self.recent]
+        return json.dumps({'generated': time.time(), 'series': series, 'recent': recent},
+                          ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        seconds = f"{METRIC_PREFIX}_span_seconds"
+        lines = [f"# HELP {seconds} Duration of instrumented scrape and render spans",
+                 f"# TYPE {seconds} histogram"]
+        errors, statuses, sizes = [], [], []
+        with self._lock:
+            for (name, labels), s in sorted(self._series.items()):
+                base = {'span': name, **dict(labels)}
+                for bound, count in zip(self.bounds, _cumulative(s.buckets)):
+                    lines.append(f"{seconds}_bucket{_labels({**base, 'le': repr(bound)})} {count}")
+                lines.append(f"{seconds}_bucket{_labels({**base, 'le': '+Inf'})} {s.count}")
+                lines.append(f"{seconds}_sum{_labels(base)} {s.total:.6f}")
+                lines.append(f"{seconds}_count{_labels(base)} {s.count}")
+                errors += [f"{_labels({**base, 'error': error})} {n}" for error, n in sorted(s.errors.items())]
+                statuses += [f"{_labels({**base, 'status': status})} {n}" for status, n in sorted(s.statuses.items())]
+                if s.bytes:
+                    sizes.append(f"{_labels(base)} {s.bytes}")
+        for metric, help_text, samples in (
+                ('span_errors_total', 'Failed spans by error class', errors),
+                ('http_responses_total', 'HTTP responses by status code', statuses),
+                ('downloaded_bytes_total', 'Response bytes downloaded', sizes)):
+            lines += [f"# HELP {METRIC_PREFIX}_{metric} {help_text}", f"# TYPE {METRIC_PREFIX}_{metric} counter"]
+            lines += [f"{METRIC_PREFIX}_{metric}{sample}" for sample in samples]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Path):
+        """Atomically write a metrics file; ``.json`` paths get JSON, others Prometheus text"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = self.to_json() if path.suffix == '.json' else self.to_prometheus()
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(body, encoding='utf-8')
+        os.replace(tmp, path)
+
+
+def _cumulative(buckets: List[int]) -> List[int]:
+    total, out = 0, []
+    for count in buckets:
+        total += count
+        out.append(total)
+    return out
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+# Process-wide recorder shared by the scraper, the scheduler and the dashboard
+TELEMETRY = Telemetry()
+span = TELEMETRY.span
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pytest
+
+from crawl import CrawlFrontier, html_encoding, normalize_url
+from intelligence import CompetitorIntelligence
+
+LISTING = b"""<html><body>
+<nav><h3>Fahrzeuge</h3><h3>Standorte</h3></nav>
+<main>
+  <article class="offer"><div><h3>VW Golf 8</h3></div><p><span class="price">CHF 29'900</span></p>
+    <a class="details" href="/angebote/golf#preis">Details</a></article>
+  <article class="offer"><h3>VW Polo</h3><span class="price">CHF 19'900</span></article>
+  <article class="offer"><h3>VW Tiguan</h3><p>Preis auf Anfrage</p></article>
+</main>
+<a rel="next" href="/aktionen?page=2">weiter</a>
+</body></html>"""
+
+CORPUS = Path(__file__).parent / 'bench' / 'corpus'
+CONFIG = {'selector_title': 'h3', 'selector_price': '.price', 'selector_detail': 'a.details'}
+EXTRACTORS = ['_extract_lxml', '_extract_soup']
+
+
+@pytest.fixture(scope='module')
+def scraper():
+    return CompetitorIntelligence.offline()
+
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_pairs_without_cards_skip_titles_outside_offers(scraper, extractor):
+    pairs, next_links, detail_links, _ = getattr(scraper, extractor)(CONFIG, LISTING)
+    assert pairs == [('VW Golf 8', "CHF 29'900"), ('VW Polo', "CHF 19'900")]
+    assert next_links == ['/aktionen?page=2']
+    assert detail_links == ['/angebote/golf#preis']
+
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_pairs_with_cards_keep_unpriced_offers(scraper, extractor):
+    pairs = getattr(scraper, extractor)({**CONFIG, 'selector_card': 'article.offer'}, LISTING)[0]
+    assert pairs == [('VW Golf 8', "CHF 29'900"), ('VW Polo', "CHF 19'900"), ('VW Tiguan', None)]
+
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_shared_ancestor_with_two_prices_pairs_nothing(scraper, extractor):
+    page = b"""<html><body><div><h3>VW Golf</h3>
+        <span class="price">CHF 29'900</span><span class="price">CHF 19'900</span></div></body></html>"""
+    assert getattr(scraper, extractor)(CONFIG, page)[0] == [('VW Golf', None)]
+
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_titles_without_any_price_are_kept(scraper, extractor):
+    page = b'<html><body><h3>VW Golf</h3><h3>VW Polo</h3></body></html>'
+    assert getattr(scraper, extractor)(CONFIG, page)[0] == [('VW Golf', None), ('VW Polo', None)]
+
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+@pytest.mark.parametrize('page', [
+    '<html><body><h3>Lagerräumung VW Golf</h3></body></html>'.encode('utf-8'),
+    '<html><head><meta charset="iso-8859-1"></head><body><h3>Lagerräumung VW Golf</h3></body></html>'.encode('latin-1'),
+    '<html><body><h3>Lagerräumung VW Golf</h3></body></html>'.encode('windows-1252'),
+])
+def test_titles_are_decoded_without_charset_guessing(scraper, extractor, page):
+    assert getattr(scraper, extractor)(CONFIG, page)[0] == [('Lagerräumung VW Golf', None)]
+
+
+def test_keyword_text_follows_document_order(scraper):
+    page = b'<html><body><div><span>VW</span> Golf</div> Gratis <p><b>Service</b><!-- x --> Paket</p></body></html>'
+    text = scraper._extract_lxml(CONFIG, page)[3]
+    assert ' '.join(text.split()) == 'VW Golf Gratis Service Paket'
+
+
+@pytest.mark.parametrize('page', [
+    b'<html><body><div><span>VW</span> Golf</div> Gratis <p><b>Service</b> und Leasing</p></body></html>',
+    (CORPUS / 'garage_angebote.html').read_bytes(),
+])
+def test_keyword_hits_match_between_lxml_and_soup(scraper, page):
+    terms = ('vw golf', 'golf gratis', 'gratis service', 'bmw 320d', 'rabatt')
+    lxml_text, soup_text = (getattr(scraper, extractor)(CONFIG, page)[3] for extractor in EXTRACTORS)
+    lxml_hits, soup_hits = ({term: hit.count for term, hit in scraper._match_keywords(text, terms).items()}
+                            for text in (lxml_text, soup_text))
+    assert lxml_hits and lxml_hits == soup_hits
+
+
+def test_html_encoding():
+    assert html_encoding('<p>Prämie</p>'.encode('utf-8')) == 'utf-8'
+    assert html_encoding(b'\xef\xbb\xbf<p>x</p>') == 'utf-8'
+    assert html_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">') == 'iso8859-1'
+    assert html_encoding(b'<meta charset="x-unknown"><p>Pr\xe4mie</p>') == 'windows-1252'
+
+
+def test_normalize_url():
+    base = 'https://WWW.Dealer.ch/aktionen'
+    assert normalize_url('/angebote/1#preis', base) == 'https://www.dealer.ch/angebote/1'
+    assert normalize_url('mailto:info@dealer.ch', base) is None
+    assert normalize_url('javascript:void(0)', base) is None
+
+
+def test_frontier_pagination_keeps_depth_details_add_one():
+    frontier = CrawlFrontier('https://www.dealer.ch/aktionen', max_depth=1, max_pages=10)
+    visited = []
+    for url, depth in frontier:
+        visited.append((url, depth))
+        if url.endswith('/aktionen'):
+            frontier.add_links(url, ['?page=2', 'https://other.example/x'], ['/angebote/1'], depth)
+        elif url.endswith('page=2'):
+            frontier.add_links(url, ['/aktionen'], ['/angebote/1#x', '/angebote/2'], depth)
+        else:
+            frontier.add_links(url, [], ['/angebote/3'], depth)
+    assert visited == [
+        ('https://www.dealer.ch/aktionen', 0),
+        ('https://www.dealer.ch/aktionen?page=2', 0),
+        ('https://www.dealer.ch/angebote/1', 1),
+        ('https://www.dealer.ch/angebote/2', 1),
+    ]
+
+
+def test_frontier_page_budget():
+    frontier = CrawlFrontier('https://dealer.ch/p1', max_depth=1, max_pages=2)
+    visited = []
+    for url, depth in frontier:
+        visited.append(url)
+        frontier.add_links(url, [f'/p{len(visited) + 1}'], [], depth)
+    assert visited == ['https://dealer.ch/p1', 'https://dealer.ch/p2']
@@ -0,0 +1,53 @@
+import pytest
+
+from health import BREAKER_FAILURES, HealthRegistry, is_transport_failure
+
+
+@pytest.mark.parametrize('error, expected', [
+    ('ReadTimeout', True),
+    ('ConnectionError', True),
+    ('HTTP503', True),
+    ('HTTP429', True),
+    ('HTTP404', False),
+    ('NoOffersFound', False),
+    ('PermissionError', False),
+    (None, False),
+])
+def test_is_transport_failure(error, expected):
+    assert is_transport_failure(error) is expected
+
+
+def test_extraction_errors_never_open_the_circuit(tmp_path):
+    health = HealthRegistry(tmp_path / 'health.json')
+    for error in ['NoOffersFound', 'HTTP404', 'PermissionError'] * BREAKER_FAILURES:
+        health.record('Garage', error)
+    assert health.allow('Garage')
+    assert health.last_error('Garage') == 'PermissionError'
+
+
+def test_transport_failures_open_the_circuit(tmp_path):
+    health = HealthRegistry(tmp_path / 'health.json')
+    for _ in range(BREAKER_FAILURES):
+        health.record('Garage', 'ReadTimeout')
+    assert not health.allow('Garage')
+
+
+def test_circuit_opened_by_extraction_error_closes_on_reload(tmp_path):
+    path = tmp_path / 'health.json'
+    health = HealthRegistry(path)
+    health.record('Garage', 'NoOffersFound')
+    # As persisted by the former breaker, which counted every error
+    record = health._records['Garage']
+    record.failures, record.trips, record.open_until = BREAKER_FAILURES, 1, 1e12
+    health.flush()
+    assert HealthRegistry(path).allow('Garage')
+
+
+def test_registry_without_path_never_touches_the_disk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    health = HealthRegistry(None)
+    health.record('Garage', 'ReadTimeout')
+    health.reload()
+    health.flush()
+    assert health.last_error('Garage') == 'ReadTimeout'
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,47 @@
+from keywords import KeywordMatcher, normalize
+
+
+def counts(terms, text):
+    return {term: hit.count for term, hit in KeywordMatcher(terms).find(text).items()}
+
+
+def test_prefix_term_matches_longer_words():
+    assert counts(['aktion*'], 'Aktionen und eine Aktion') == {'aktion': 2}
+
+
+def test_matches_are_word_bounded():
+    assert counts(['aktion*', 'golf'], 'Reaktion im Golfclub') == {}
+
+
+def test_punctuation_insensitive_tokens():
+    assert counts(['CX-5'], 'Mazda cx 5 Revolution') == {'cx-5': 1}
+    assert counts(['cx 5'], 'Mazda CX-5 Revolution') == {'cx 5': 1}
+
+
+def test_umlauts_and_diacritics_are_folded():
+    assert normalize('Straße') == 'strasse'
+    assert normalize('Citroën') == 'citroen'
+    assert counts(['Rückkauf'], 'RUECKKAUF-Garantie') == {'rückkauf': 1}
+    assert counts(['Prämie'], 'Eintauschpraemie und Prämie') == {'prämie': 1}
+
+
+def test_failure_links_report_overlapping_terms():
+    # 'golf' ends inside 'vw golf'; 'gti performance' starts inside 'golf gti'
+    terms = ['vw golf', 'golf', 'golf gti', 'gti performance']
+    assert counts(terms, 'VW Golf GTI Performance') == {
+        'vw golf': 1, 'golf': 1, 'golf gti': 1, 'gti performance': 1}
+
+
+def test_failure_link_after_partial_match():
+    # 'golf polo' fails on 'golf', which must restart at the 'golf gti' branch
+    assert counts(['golf polo', 'golf gti'], 'golf golf gti') == {'golf gti': 1}
+
+
+def test_multi_token_prefix_term():
+    assert counts(['gratis service*'], 'Gratis Servicepaket, gratis Wartung') == {'gratis service': 1}
+
+
+def test_positions_are_offsets_into_original_text():
+    text = 'Top-Leasing ab 0% – Leasingangebot'
+    hits = KeywordMatcher(['leasing*']).find(text)
+    assert hits['leasing'].positions == [text.index('Leasing'), text.index('Leasingangebot')]
@@ -0,0 +1,37 @@
+import pytest
+
+from offers import normalize_offer, parse_discount, parse_price
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Fr. 35'500.–", (35500.0, 'CHF', False)),
+    ("CHF 45’900.-", (45900.0, 'CHF', False)),
+    ('CHF 29,900', (29900.0, 'CHF', False)),
+    ('CHF 1 234.50', (1234.5, 'CHF', False)),
+    ('EUR 19.900', (19900.0, 'EUR', False)),
+    ('CHF 299/Mt', (299.0, 'CHF', True)),
+    ('ab CHF 199 mtl.', (199.0, 'CHF', True)),
+    ('€ 299 pro Monat', (299.0, 'EUR', True)),
+    ('Auf Anfrage', (None, 'CHF', False)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('15% Rabatt', 15.0),
+    ('bis 20 % Rabatt', 20.0),
+    ('1.9% Zins', None),
+    ('0% Leasing', None),
+    ('3,5% Finanzierung', None),
+    ('2.9 % eff. Jahreszins', None),
+    ('Inkl. Wallbox', None),
+])
+def test_parse_discount_excludes_financing_rates(text, expected):
+    assert parse_discount(text) == expected
+
+
+def test_normalize_offer_is_idempotent():
+    offer = normalize_offer({'title': 'VW Golf', 'price': 'CHF 299/Mt', 'discount': '10% Rabatt'})
+    assert (offer['amount'], offer['monthly'], offer['discount_pct']) == (299.0, True, 10.0)
+    assert normalize_offer(offer) is offer
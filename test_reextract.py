@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from archive import PageArchive, content_digest
+from intelligence import HttpCache, SnapshotStore
+from reextract import reextract
+
+PAGE = (Path(__file__).parent / 'bench' / 'corpus' / 'garage_angebote.html').read_bytes()
+URL = 'https://www.garage.ch/aktionen'
+COMPETITORS = {'Garage': {'aktionen_url': URL, 'selector_title': 'h2.title', 'selector_price': '.preis'}}
+
+
+def test_rewrite_discards_the_competitors_cache_entries(tmp_path):
+    archive = PageArchive(tmp_path / 'pages')
+    digest = content_digest(PAGE)
+    archive.put(PAGE, digest)
+    store = SnapshotStore(tmp_path / 'snapshots.db')
+    store.record('Garage', {'source': 'live', 'aktionen': [{'title': 'Alt', 'price': 'CHF 1'}],
+                            'pages': [[URL, digest]]})
+    cache = HttpCache(tmp_path / 'http_cache.json')
+    cache.put(URL, '"v1"', None, digest, {'offers': []}, 'old-selectors')
+    cache.put('https://www.other.ch/', '"v1"', None, digest, {'offers': []}, 'old-selectors')
+
+    stats = reextract(store, archive, COMPETITORS, workers=1, dry_run=True, http_cache=cache)
+    assert stats['rewritten'] == 1 and cache.get(URL) is not None
+
+    stats = reextract(store, archive, COMPETITORS, workers=1, http_cache=cache)
+    assert stats['cache_discarded'] == 1
+    assert list(HttpCache(tmp_path / 'http_cache.json')._entries) == ['https://www.other.ch/']
+    assert len(store.latest()['Garage']['aktionen']) == 4
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from refresh import RefreshCoordinator
+
+COMPETITORS = {'Garage': {}, 'Autohaus': {}}
+
+
+class BlockingRun:
+    """Stub scrape that yields one result per competitor once released"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.release = threading.Event()
+        self.error = error
+
+    def __call__(self, competitors):
+        self.calls.append(sorted(competitors))
+        assert self.release.wait(5)
+        for name in competitors:
+            yield name, {'competitor': name, 'run': len(self.calls)}
+        if self.error is not None:
+            raise self.error
+
+
+def test_concurrent_refreshes_join_the_flight():
+    run = BlockingRun()
+    coordinator = RefreshCoordinator(run)
+    state, first = coordinator.refresh(COMPETITORS)
+    assert state == 'started'
+    assert coordinator.refresh(COMPETITORS)[0] == 'joined'
+    state, subset = coordinator.refresh({'Garage': {}})
+    assert state == 'joined'
+    run.release.set()
+    results = dict(first)
+    assert list(subset) == [('Garage', results['Garage'])]
+    assert set(results) == set(COMPETITORS) and run.calls == [sorted(COMPETITORS)]
+
+
+def test_superset_starts_a_new_flight():
+    run = BlockingRun()
+    coordinator = RefreshCoordinator(run)
+    _, first = coordinator.refresh({'Garage': {}})
+    state, second = coordinator.refresh(COMPETITORS)
+    assert state == 'started'
+    run.release.set()
+    assert dict(first).keys() == {'Garage'} and dict(second).keys() == set(COMPETITORS)
+    assert len(run.calls) == 2
+
+
+def test_finished_flight_is_replayed_within_the_freshness_window():
+    run = BlockingRun()
+    run.release.set()
+    coordinator = RefreshCoordinator(run, freshness=60)
+    results = list(coordinator.refresh(COMPETITORS)[1])
+    state, replay = coordinator.refresh(COMPETITORS)
+    assert state == 'fresh' and list(replay) == results and len(run.calls) == 1
+
+
+def test_refresh_after_the_freshness_window_runs_again():
+    run = BlockingRun()
+    run.release.set()
+    coordinator = RefreshCoordinator(run, freshness=0)
+    list(coordinator.refresh(COMPETITORS)[1])
+    state, results = coordinator.refresh(COMPETITORS)
+    assert state == 'started'
+    assert [result['run'] for _, result in results] == [2, 2]
+
+
+def test_failed_flight_reaches_followers_and_is_not_replayed():
+    run = BlockingRun(error=RuntimeError('scrape crashed'))
+    coordinator = RefreshCoordinator(run, freshness=60)
+    _, leader = coordinator.refresh(COMPETITORS)
+    _, follower = coordinator.refresh(COMPETITORS)
+    run.release.set()
+    for results in (leader, follower):
+        received = []
+        with pytest.raises(RuntimeError, match='scrape crashed'):
+            for item in results:
+                received.append(item)
+        assert [name for name, _ in received] == list(COMPETITORS)
+    run.error = None
+    state, retry = coordinator.refresh(COMPETITORS)
+    assert state == 'started'
+    assert [result['run'] for _, result in retry] == [2, 2]
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pandas as pd
+
+from matching import model_price_comparison
+from offers import parse_price
+from rollups import ALL, SCHEMA, apply_rollups, rollup_rows, top_models
+
+SNAPSHOT = [
+    {'title': 'Mercedes-Benz A 180 Edition', 'price': "CHF 35'500", 'type': 'Neuwagen'},
+    {'title': 'Mercedes A-Klasse Edition 10% Rabatt', 'price': "CHF 33'900", 'type': 'Neuwagen'},
+    {'title': 'Winterreifen-Aktion 25%', 'price': 'Fr. 599.–', 'type': 'Service'},
+]
+
+
+def test_title_variants_share_one_model_row():
+    rows = rollup_rows('Garage', '2026-03-04T10:00:00', SNAPSHOT)
+    day = {(category, model): (offers, priced) for grain, _, _, category, model, _, offers, priced, *_ in rows
+           if grain == 'day'}
+    assert day == {(ALL, ALL): (3, 3), ('Neuwagen', 'Mercedes-Benz A'): (2, 2)}
+
+
+def test_top_models_lists_rollup_keys():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(SCHEMA)
+    apply_rollups(conn, rollup_rows('Garage', '2026-03-04T10:00:00', SNAPSHOT))
+    apply_rollups(conn, rollup_rows('Autohaus', '2026-03-05T10:00:00', [{'title': 'VW ID.4 Pro', 'price': "CHF 49'900"}]))
+    assert top_models(conn) == ['Mercedes-Benz A', 'VW ID4']
+
+
+def test_trend_models_match_the_price_comparison():
+    offers = pd.DataFrame([
+        ('Garage', 'VW ID.4 Pro Performance', "CHF 49'900"),
+        ('Garage', 'VW Golf 8 Life', "CHF 29'900"),
+        ('Autohaus', 'Volkswagen ID4 Style', "CHF 51'500"),
+        ('Autohaus', 'Volkswagen Golf GTI', "CHF 45'900"),
+    ], columns=['competitor', 'title', 'price'])
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(SCHEMA)
+    for competitor, rows in offers.groupby('competitor'):
+        apply_rollups(conn, rollup_rows(competitor, '2026-03-04T10:00:00', rows.to_dict('records')))
+    priced = offers.assign(amount=offers['price'].map(lambda p: parse_price(p)[0]), monthly=False)
+    assert set(model_price_comparison(priced)['model']) == set(top_models(conn)) == {'VW ID4', 'VW Golf'}
+
+
+def test_make_less_title_joins_the_model_series_of_other_competitors():
+    offers = pd.DataFrame([
+        ('A', 'VW Golf 8 Life', "CHF 29'900"),
+        ('B', 'Golf GTI Clubsport', "CHF 49'900"),
+    ], columns=['competitor', 'title', 'price'])
+    priced = offers.assign(amount=offers['price'].map(lambda p: parse_price(p)[0]), monthly=False)
+    comparison = model_price_comparison(priced)
+    assert set(comparison.loc[comparison['competitor'] == 'B', 'model']) == {'VW Golf'}
+
+    rows = rollup_rows('B', '2026-03-04T10:00:00', offers[offers['competitor'] == 'B'].to_dict('records'))
+    assert {model for _, _, _, _, model, *_ in rows} == {ALL, 'VW Golf'}
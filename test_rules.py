@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from offers import offers_frame
+from rules import RuleSet, get_rule_set
+
+
+def data_of(**aktionen):
+    return {competitor: {'aktionen': [{'title': t, 'price': p, 'discount': d, 'type': 'Neuwagen'}
+                                      for t, p, d in offers], 'source': 'live'}
+            for competitor, offers in aktionen.items()}
+
+
+def alerts(data, rule_set=None):
+    return (rule_set or RuleSet.load()).evaluate(data, offers_frame(data))
+
+
+def by_rule(hits, rule):
+    return [hit['message'] for hit in hits if hit['rule'] == rule]
+
+
+@pytest.mark.parametrize('discount, fires', [
+    ('19% Rabatt', False),
+    ('20% Rabatt', True),
+    ('21% Rabatt', True),
+    ('30% Rabatt', True),
+])
+def test_aggressive_discount_threshold(discount, fires):
+    hits = alerts(data_of(AMAG=[], Garage=[('VW Golf', "CHF 29'900", discount)]))
+    assert bool(by_rule(hits, 'aggressive_discount')) is fires
+
+
+def test_leasing_undercut_compares_with_own_cheapest_rate():
+    data = data_of(AMAG=[('VW Golf Leasing', 'CHF 299/Mt', None), ('VW Polo Leasing', 'CHF 249/Mt', None)],
+                   Garage=[('Golf Leasing', 'CHF 239/Mt', None), ('Polo Leasing', 'CHF 259/Mt', None)])
+    assert by_rule(alerts(data), 'leasing_undercut') == [
+        'Garage: Leasingrate unter AMAG-Bestwert - Golf Leasing (CHF 239/Mt)']
+
+
+def test_leasing_undercut_without_own_monthly_offers():
+    data = data_of(AMAG=[('VW Golf', "CHF 29'900", None)], Garage=[('Golf Leasing', 'CHF 99/Mt', None)])
+    hits = alerts(data)
+    assert by_rule(hits, 'leasing_undercut') == []
+    assert by_rule(hits, 'attractive_leasing') == ['Garage: Attraktives Leasing - CHF 99/Mt']
+
+
+RULES = {
+    'own_competitor': 'AMAG',
+    'rule': [
+        {'id': 'free', 'level': 'info', 'priority': 10, 'message': '{competitor}: Gratis-Angebot',
+         'when': [{'column': 'title', 'contains': ['gratis']}]},
+        {'id': 'discount', 'level': 'critical', 'priority': 100, 'message': '{competitor}: {title}',
+         'when': [{'column': 'discount_pct', 'op': '>=', 'value': 20}]},
+    ],
+}
+DATA = data_of(AMAG=[], Garage=[('Gratis Service', 'CHF 1', None), ('Gratis Reifen', 'CHF 1', None),
+                                ('VW Golf', 'CHF 1', '25% Rabatt')])
+
+
+def test_alerts_are_deduplicated_by_message():
+    assert by_rule(alerts(DATA, RuleSet(RULES)), 'free') == ['Garage: Gratis-Angebot']
+
+
+def test_alerts_are_ranked_by_priority():
+    assert [hit['rule'] for hit in alerts(DATA, RuleSet(RULES))] == ['discount', 'free']
+
+
+def test_max_alerts_keeps_the_highest_priorities():
+    hits = alerts(DATA, RuleSet({**RULES, 'max_alerts': 1}))
+    assert [hit['message'] for hit in hits] == ['Garage: VW Golf']
+
+
+def test_rules_are_recompiled_when_the_file_changes(tmp_path):
+    path = tmp_path / 'alerts.toml'
+    path.write_text('max_alerts = 5\n', encoding='utf-8')
+    first = get_rule_set(path)
+    assert get_rule_set(path) is first
+    path.write_text('max_alerts = 7\n', encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_rule_set(path).max_alerts == 7
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from intelligence import CompetitorIntelligence
+from structured import covers_listing, extract_structured_offers
+
+CORPUS = Path(__file__).parent / 'bench' / 'corpus'
+CONFIG = {'selector_title': 'h2.title', 'selector_price': '.preis'}
+
+
+def test_featured_product_is_merged_with_cards():
+    page = (CORPUS / 'garage_angebote.html').read_bytes()
+    assert extract_structured_offers(page) == [['Mercedes-Benz A 180 Edition', "CHF 35'500", None]]
+    result = CompetitorIntelligence.offline()._parse_page(CONFIG, page)
+    assert [(a['title'], a['price']) for a in result['aktionen']] == [
+        ('Mercedes-Benz A 180 Edition', "CHF 35'500"),
+        ('BMW 320d Touring Business Paket', "Fr. 45'900.–"),
+        ('Winterreifen-Aktion 25%', 'Fr. 599.–'),
+        ('Smart EQ fortwo Elektro-Bonus', "Fr. 19'900.–"),
+    ]
+
+
+def test_item_list_replaces_card_selectors():
+    page = b"""<script type="application/ld+json">{"@type": "ItemList", "itemListElement": [
+        {"@type": "Car", "name": "VW Golf", "offers": {"@type": "Offer", "price": "29900"}}]}</script>
+        <h2 class="title">Navigation</h2><div class="preis">Fr. 1.-</div>"""
+    offers = extract_structured_offers(page)
+    assert covers_listing(page, offers)
+    result = CompetitorIntelligence.offline()._parse_page(CONFIG, page)
+    assert [a['title'] for a in result['aktionen']] == ['VW Golf']
+
+
+def test_microdata_without_charset_is_read_as_utf8():
+    page = """<div itemscope itemtype="https://schema.org/Car"><span itemprop="name">Škoda Enyaq Prämie</span>
+        <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+        <meta itemprop="price" content="45900"><meta itemprop="priceCurrency" content="CHF"></div></div>"""
+    assert extract_structured_offers(page.encode('utf-8'))[0][0] == 'Škoda Enyaq Prämie'
@@ -0,0 +1,232 @@
+"""
+AMAG Competitor Intelligence Views
+Streamlit-free chart, table, alert and export builders
+"""
+
+import json
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import pandas as pd
+
+from matching import model_price_comparison
+from rules import get_rule_set
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go  # Loaded by the chart builders on first use
+
+
+SOURCE_LABELS = {'live': '🟢 Live', 'stale': '🟠 Veraltet', 'demo': '🔴 Demo'}
+# Models in the price comparison chart
+COMPARISON_MAX_MODELS = 8
+
+
+def format_age(scraped_at: Optional[str], now: Optional[datetime] = None) -> str:
+    """'vor 5 Min.' / 'vor 3 Std.' / 'vor 2 Tagen' for an ISO timestamp"""
+    if not scraped_at:
+        return 'unbekannt'
+    seconds = ((now or datetime.now()) - datetime.fromisoformat(scraped_at)).total_seconds()
+    if seconds < 3600:
+        return f"vor {max(1, int(seconds // 60))} Min."
+    if seconds < 86400:
+        return f"vor {int(seconds // 3600)} Std."
+    return f"vor {int(seconds // 86400)} Tagen"
+
+
+def create_price_comparison_chart(offers: pd.DataFrame, comparison: Optional[pd.DataFrame] = None) -> 'go.Figure':
+    """Cheapest price per model across competitors, or top offers when no model is shared"""
+    import plotly.graph_objects as go
+    
+    if comparison is None:
+        comparison = model_price_comparison(offers)
+    if not comparison.empty:
+        return _model_comparison_chart(comparison)
+    
+    fig = go.Figure()
+    
+    # Top 3 offers per competitor that carry a price
+    top = offers.groupby('competitor', sort=False).head(3).dropna(subset=['amount'])
+    for competitor, comp_offers in top.groupby('competitor', sort=False):
+        prices = comp_offers['amount'].astype(int)
+        fig.add_trace(go.Bar(
+            name=competitor,
+            x=comp_offers['title'].str.slice(0, 20) + '...',
+            y=prices,
+            text=[f"{p:,} CHF" for p in prices],
+            textposition='auto',
+        ))
+    
+    fig.update_layout(
+        title='Preisvergleich Top-Angebote',
+        xaxis_title='Angebote',
+        yaxis_title='Preis (CHF)',
+        barmode='group',
+        height=400,
+        template='plotly_white'
+    )
+    
+    return fig
+
+
+def _model_comparison_chart(comparison: pd.DataFrame) -> 'go.Figure':
+    import plotly.graph_objects as go
+    
+    # Purchase prices when any model is shared on them, monthly rates otherwise
+    monthly = bool(comparison['monthly'].all())
+    rows = comparison[comparison['monthly'] == monthly]
+    models = list(dict.fromkeys(rows['model']))[:COMPARISON_MAX_MODELS]
+    rows = rows[rows['model'].isin(models)]
+    unit = 'CHF/Mt' if monthly else 'CHF'
+    
+    fig = go.Figure()
+    for competitor, comp_rows in rows.groupby('competitor', sort=False):
+        prices = comp_rows['amount'].astype(int)
+        fig.add_trace(go.Bar(
+            name=competitor,
+            x=comp_rows['model'],
+            y=prices,
+            text=[f"{p:,} {unit}" for p in prices],
+            textposition='auto',
+        ))
+    
+    fig.update_layout(
+        title='Preisvergleich nach Modell (günstigstes Angebot)',
+        xaxis_title='Modell',
+        yaxis_title=f'Preis ({unit})',
+        xaxis={'categoryorder': 'array', 'categoryarray': models},
+        barmode='group',
+        height=400,
+        template='plotly_white'
+    )
+    
+    return fig
+
+
+def create_model_comparison_table(comparison: pd.DataFrame) -> pd.DataFrame:
+    """One row per shared model: cheapest price per competitor and the spread"""
+    if comparison.empty:
+        return pd.DataFrame(columns=['Modell', 'Preisart', 'Anbieter', 'Differenz'])
+    table = comparison.pivot_table(index=['model', 'monthly'], columns='competitor', values='amount',
+                                   aggfunc='min', sort=False)
+    prices = table.copy()
+    table.insert(0, 'Anbieter', prices.notna().sum(axis=1))
+    table['Differenz'] = prices.max(axis=1) - prices.min(axis=1)
+    table = table.reset_index().rename(columns={'model': 'Modell', 'monthly': 'Preisart'})
+    table.columns.name = None
+    table['Preisart'] = table['Preisart'].map({False: 'Kaufpreis', True: 'Monatsrate'})
+    return table
+
+
+def create_discount_heatmap(offers: pd.DataFrame) -> 'go.Figure':
+    """Create discount heatmap"""
+    import plotly.graph_objects as go
+    
+    competitors = list(offers['competitor'].unique())
+    categories = ['Neuwagen', 'Leasing', 'Service', 'Elektro']
+    
+    # Count offers per competitor whose category contains each heatmap column
+    category = offers['category'].str.lower()
+    counts = pd.DataFrame({cat: category.str.contains(cat.lower(), regex=False) for cat in categories})
+    counts = counts.astype(int).groupby(offers['competitor'], sort=False).sum().reindex(competitors)
+    z = counts.values.tolist()
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=z,
+        x=categories,
+        y=competitors,
+        colorscale='RdYlGn',
+        text=z,
+        texttemplate="%{text}",
+        textfont={"size": 14},
+    ))
+    
+    fig.update_layout(
+        title='Angebots-Heatmap nach Kategorie',
+        height=350,
+        template='plotly_white'
+    )
+    
+    return fig
+
+
+def generate_competitive_alerts(data: Dict, offers: pd.DataFrame) -> List[Dict]:
+    """Generate intelligent alerts from the configured rules (alerts.toml)"""
+    return get_rule_set().evaluate(data, offers)
+
+
+def create_overview_table(data: Dict, offers: pd.DataFrame) -> pd.DataFrame:
+    """Build competitor overview table"""
+    # Cheapest one-off price per competitor, by parsed amount
+    one_off = offers[~offers['monthly']].dropna(subset=['amount'])
+    cheapest = one_off.loc[one_off.groupby('competitor')['amount'].idxmin()].set_index('competitor')['price']
+    
+    overview_data = []
+    for comp, comp_data in data.items():
+        overview_data.append({
+            'Wettbewerber': comp,
+            'Anzahl Aktionen': len(comp_data.get('aktionen', [])),
+            'Top-Angebot': comp_data.get('aktionen', [{}])[0].get('title', 'N/A')[:50] + '...' if comp_data.get('aktionen') else 'N/A',
+            'Niedrigster Preis': cheapest.get(comp, 'N/A'),
+            'Datenquelle': SOURCE_LABELS.get(comp_data.get('source'), SOURCE_LABELS['demo']),
+            'Update': comp_data.get('last_update', 'N/A')
+        })
+    
+    return pd.DataFrame(overview_data)
+
+
+def create_price_table(offers: pd.DataFrame) -> pd.DataFrame:
+    """Build detailed price table"""
+    return offers[['competitor', 'title', 'price', 'discount', 'category']].rename(columns={
+        'competitor': 'Wettbewerber',
+        'title': 'Angebot',
+        'price': 'Preis',
+        'discount': 'Rabatt',
+        'category': 'Kategorie'
+    })
+
+
+def create_keyword_table(data: Dict) -> pd.DataFrame:
+    """Build keyword frequency table across competitors"""
+    all_keywords = {}
+    for comp, comp_data in data.items():
+        for kw in comp_data.get('keywords', []):
+            if kw not in all_keywords:
+                all_keywords[kw] = []
+            all_keywords[kw].append(comp)
+    
+    return pd.DataFrame([
+        {'Keyword': kw, 'Häufigkeit': len(comps), 'Wettbewerber': ', '.join(comps)}
+        for kw, comps in all_keywords.items()
+    ], columns=['Keyword', 'Häufigkeit', 'Wettbewerber']).sort_values('Häufigkeit', ascending=False)
+
+
+def create_keyword_chart(kw_data: pd.DataFrame) -> 'go.Figure':
+    """Create top keyword bar chart"""
+    import plotly.express as px
+    
+    return px.bar(kw_data.head(10), x='Häufigkeit', y='Keyword', 
+                  orientation='h', title='Top 10 Keywords im Markt')
+
+
+def create_trend_chart(rows: List[Dict], title: str, y_title: str) -> 'go.Figure':
+    """Line per competitor over the rollup periods"""
+    import plotly.express as px
+    
+    fig = px.line(pd.DataFrame(rows), x='period', y='value', color='competitor', markers=True,
+                  title=title, hover_data=['observations'])
+    fig.update_layout(xaxis_title='Periode', yaxis_title=y_title, legend_title='Wettbewerber')
+    return fig
+
+
+def export_json_data(data: Dict) -> str:
+    """Export data as JSON"""
+    export_data = {
+        'timestamp': datetime.now().isoformat(),
+        'data': data,
+        'summary': {
+            'total_competitors': len(data),
+            'total_offers': sum(len(d.get('aktionen', [])) for d in data.values()),
+            'data_source': 'live' if any(d.get('source') == 'live' for d in data.values()) else 'demo'
+        }
+    }
+    return json.dumps(export_data, indent=2, ensure_ascii=False)